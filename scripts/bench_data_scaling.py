@@ -0,0 +1,230 @@
+"""How endpoint latency grows with the size of the database.
+
+Usage: poetry run python scripts/bench_data_scaling.py
+           [--sizes 10000,1000000,10000000] [--samples 200]
+
+For every size N a database with N users and N registrations is generated
+with ``generate_dataset.py`` (bcrypt at 4 rounds, so logins measure the
+lookup rather than the hash) and kept in ``--data-dir`` for the next run.
+Each endpoint is then called ``--samples`` times, one request at a time,
+through ``httpx.ASGITransport``.
+
+The report gives p50/p95 and SQL statements per request for every size, and
+the scaling exponent of p50 between consecutive sizes: about 0 for index
+lookups, 1 when latency grows with the table and above 1 when it grows
+faster. Statements whose captured query plan scans a table are listed too.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchlib import format_summary, summarize
+from generate_dataset import generate, registration_slot
+from thaitravel import models
+from thaitravel.core import config, pagination, rate_limit, security, slow_queries
+from thaitravel.core.login_tracker import last_login_buffer
+from thaitravel.core.principal_cache import principal_cache
+from thaitravel.core.province_tax_cache import province_tax_table
+from thaitravel.main import app
+
+PASSWORD = "password"
+ADMIN_ID = 1
+SQL_QUERIES = re.compile(r'desc="(\d+) queries')
+
+
+def bearer(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {security.create_access_token({'sub': user_id})}"}
+
+
+def endpoints(size: int, rng: random.Random):
+    """Name and a request factory per endpoint, for a database of ``size``."""
+    admin = bearer(ADMIN_ID)
+    free_slots = iter(range(size, size * len(models.ProvinceEnum)))
+
+    def random_user() -> int:
+        return rng.randint(1, size)
+
+    def register():
+        user_id, province_id = registration_slot(next(free_slots), size)
+        return (
+            "POST",
+            "/v1/province_tax/register",
+            {
+                "headers": bearer(user_id),
+                "json": {
+                    "name": "Scaling Bench",
+                    "email": "scaling@example.com",
+                    "main_province_id": province_id,
+                },
+            },
+        )
+
+    return {
+        "login": lambda: (
+            "POST",
+            "/v1/token",
+            {"data": {"username": f"user{rng.randint(2, size)}", "password": PASSWORD}},
+        ),
+        "users_me": lambda: ("GET", "/v1/users/me", {"headers": bearer(random_user())}),
+        "users_page": lambda: (
+            "GET",
+            "/v1/users",
+            {
+                "headers": admin,
+                "params": {
+                    "limit": 50,
+                    "cursor": pagination.encode_cursor(random_user()),
+                },
+            },
+        ),
+        "province_tax_base": lambda: ("GET", "/v1/province_tax/base", {}),
+        "registered": lambda: (
+            "GET",
+            "/v1/province_tax/registered",
+            {"headers": bearer(random_user())},
+        ),
+        "summary": lambda: ("GET", "/v1/province_tax/summary", {"headers": admin}),
+        "register": register,
+    }
+
+
+async def measure(client: httpx.AsyncClient, request, samples: int) -> dict:
+    durations: list[float] = []
+    queries: list[int] = []
+    errors = 0
+    for i in range(samples + 5):
+        method, url, kwargs = request()
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        if i < 5:
+            continue  # first calls compile statements and fill caches
+        durations.append(elapsed)
+        errors += response.status_code >= 400
+        match = SQL_QUERIES.search(response.headers.get("server-timing", ""))
+        if match:
+            queries.append(int(match.group(1)))
+
+    summary = summarize(durations)
+    summary["errors"] = errors
+    summary["sql_per_request"] = sum(queries) / len(queries) if queries else 0.0
+    return summary
+
+
+async def run_size(path: Path, size: int, args) -> dict:
+    await models.init_db(config.Settings(SQLDB_URL=f"sqlite+aiosqlite:///{path}"))
+    province_tax_table.invalidate()
+    principal_cache.clear()
+    security.verified_tokens.clear()
+    slow_queries.recorder.clear()
+    last_login_buffer.start(models.async_session_factory)
+    results = {}
+    try:
+        rng = random.Random(args.seed)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            for name, request in endpoints(size, rng).items():
+                # users_me and registered would otherwise mostly hit the
+                # principal cache, which hides the user lookup
+                principal_cache.clear()
+                results[name] = await measure(client, request, args.samples)
+                print(
+                    f"{format_summary(f'{size:>10,} {name}', results[name])} "
+                    f"sql/req={results[name]['sql_per_request']:.2f} "
+                    f"errors={results[name]['errors']}"
+                )
+        for stats in slow_queries.recorder.top(len(slow_queries.recorder.statements)):
+            scans = [step for step in stats.plan or () if step.startswith("SCAN ")]
+            if scans:
+                print(
+                    f"{size:>10,} scan: {stats.statement[:100]} -- {'; '.join(scans)}"
+                )
+    finally:
+        await last_login_buffer.stop(models.async_session_factory)
+        await models.close_db()
+    return results
+
+
+def report(results: dict[int, dict]):
+    sizes = sorted(results)
+    print()
+    print(f"{'endpoint':<20}" + "".join(f"{f'p50@{size:,}':>16}" for size in sizes))
+    for name in results[sizes[0]]:
+        p50s = [results[size][name]["p50_ms"] for size in sizes]
+        line = f"{name:<20}" + "".join(f"{p50:14.2f}ms" for p50 in p50s)
+        exponents = [
+            math.log(b / a) / math.log(size_b / size_a)
+            for a, b, size_a, size_b in zip(p50s, p50s[1:], sizes, sizes[1:])
+        ]
+        if exponents:
+            line += "   exponent " + ", ".join(f"{e:.2f}" for e in exponents)
+            worst = max(exponents)
+            if worst > 1.1:
+                line += "  SUPER-LINEAR"
+            elif worst > 0.5:
+                line += "  grows with data"
+        print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default="10000,1000000,10000000",
+        help="comma separated row counts, for users and registrations each",
+    )
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=Path(tempfile.gettempdir()) / "thaitravel-datasets",
+        help="generated databases are kept here and reused",
+    )
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    args = parser.parse_args()
+
+    # one client address and a handful of accounts log in over and over
+    for limiter in (rate_limit.login_ip_limiter, rate_limit.login_account_limiter):
+        limiter.rate = limiter.burst = 1e9
+
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    results = {}
+    for size in sorted(int(size) for size in args.sizes.split(",")):
+        path = args.data_dir / f"dataset-{size}-{args.seed}.db"
+        if not path.exists():
+            started = time.perf_counter()
+            partial = path.with_suffix(".partial")
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{partial}{suffix}").unlink(missing_ok=True)
+            await generate(partial, size, size, seed=args.seed, bcrypt_rounds=4)
+            partial.rename(path)
+            print(f"Generated {path} in {time.perf_counter() - started:.1f}s")
+        # run on a copy, so the register writes do not pile up between runs
+        work = args.data_dir / f"work-{size}.db"
+        shutil.copyfile(path, work)
+        try:
+            results[size] = await run_size(work, size, args)
+        finally:
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{work}{suffix}").unlink(missing_ok=True)
+
+    report(results)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+"""Cost of verifying a bearer token: python-jose, PyJWT and the verified-token cache.
+
+Usage: poetry run python scripts/bench_jwt.py [--tokens 1 100] [--calls 100000]
+
+Each run decodes ``--calls`` tokens drawn round-robin from ``--tokens``
+distinct tokens, the way a worker sees the same few bearer tokens again and
+again. python-jose is no longer a dependency and is skipped if missing.
+"""
+
+import argparse
+import time
+
+import jwt
+
+from thaitravel.core import config, security
+
+settings = config.get_settings()
+
+
+def pyjwt_decode(token: str) -> dict:
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+
+
+def cached_decode(token: str) -> dict:
+    return security.decode_token(token)
+
+
+def jose_decoder():
+    try:
+        from jose import jwt as jose_jwt
+    except ImportError:
+        return None
+
+    def jose_decode(token: str) -> dict:
+        return jose_jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+        )
+
+    return jose_decode
+
+
+def per_call(decode, tokens: list[str], calls: int) -> float:
+    started = time.perf_counter()
+    for i in range(calls):
+        decode(tokens[i % len(tokens)])
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    decoders = {"python-jose": jose_decoder(), "pyjwt": pyjwt_decode}
+    decoders["pyjwt + cache"] = cached_decode
+
+    print(f"{'tokens':>8} " + " ".join(f"{name:>16}" for name in decoders))
+    for count in args.tokens:
+        tokens = [security.create_access_token({"sub": i}) for i in range(count)]
+        security.verified_tokens.clear()
+        timings = []
+        for decode in decoders.values():
+            if decode is None:
+                timings.append(" " * 13 + "n/a")
+                continue
+            timings.append(f"{per_call(decode, tokens, args.calls) * 1e6:>14.2f}us")
+        print(f"{count:>8} " + " ".join(timings))
+
+
+if __name__ == "__main__":
+    main()
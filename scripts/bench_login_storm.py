@@ -0,0 +1,114 @@
+"""Latency of authenticated reads during a login storm, inline vs pooled bcrypt.
+
+Usage: poetry run python scripts/bench_login_storm.py [--logins 16] [--readers 8]
+
+Login clients hit ``POST /v1/token`` in a loop while readers fetch
+``GET /v1/users/me`` with a token obtained up front. With bcrypt inline every
+login blocks the event loop for the whole hash, so the readers queue behind
+it; with the pool only the logins wait.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchlib import format_summary, summarize
+from thaitravel import models
+from thaitravel.core import config, password_hashing, rate_limit
+from thaitravel.main import app
+
+USER = {
+    "email": "storm@example.com",
+    "username": "storm",
+    "first_name": "Login",
+    "last_name": "Storm",
+    "province": "Bangkok",
+    "password": "password",
+}
+
+
+async def login_loop(client, stop: asyncio.Event, samples: list[float], busy: list):
+    form = {"username": USER["username"], "password": USER["password"]}
+    while not stop.is_set():
+        started = time.perf_counter()
+        resp = await client.post("/v1/token", data=form)
+        if resp.status_code == 503:
+            busy.append(1)
+            await asyncio.sleep(float(resp.headers["Retry-After"]))
+            continue
+        samples.append(time.perf_counter() - started)
+
+
+async def read_loop(client, stop: asyncio.Event, headers: dict, samples: list[float]):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/v1/users/me", headers=headers)
+        samples.append(time.perf_counter() - started)
+
+
+async def run(args, workers: int) -> tuple[dict, dict, int]:
+    # the storm logs in as one account, far past the per-account login limit
+    for limiter in (rate_limit.login_ip_limiter, rate_limit.login_account_limiter):
+        limiter.rate = limiter.burst = 1e9
+    hasher = password_hashing.hasher
+    hasher.workers = workers
+    hasher.max_pending = args.max_pending
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = config.Settings(
+            SQLDB_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        )
+        await models.init_db(settings)
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench"
+            ) as client:
+                await client.post("/v1/users/create", json=USER)
+                token = await client.post(
+                    "/v1/token",
+                    data={"username": USER["username"], "password": USER["password"]},
+                )
+                headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+
+                stop = asyncio.Event()
+                logins: list[float] = []
+                reads: list[float] = []
+                busy: list[int] = []
+                tasks = [
+                    asyncio.create_task(login_loop(client, stop, logins, busy))
+                    for _ in range(args.logins)
+                ]
+                tasks += [
+                    asyncio.create_task(read_loop(client, stop, headers, reads))
+                    for _ in range(args.readers)
+                ]
+                await asyncio.sleep(args.duration)
+                stop.set()
+                await asyncio.gather(*tasks)
+                return summarize(reads), summarize(logins), len(busy)
+        finally:
+            await models.close_db()
+            hasher.shutdown()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds")
+    args = parser.parse_args()
+
+    for name, workers in (("inline", 0), (f"pool of {args.workers}", args.workers)):
+        reads, logins, busy = await run(args, workers)
+        print(format_summary(f"{name}: /users/me", reads))
+        print(f"{format_summary(f'{name}: /token', logins)} 503s={busy}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
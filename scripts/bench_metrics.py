@@ -0,0 +1,65 @@
+"""Per-request cost of recording metrics.
+
+Usage: poetry run python scripts/bench_metrics.py [--calls 200000]
+
+Times the two recording calls ``MetricsMiddleware`` makes per request, then
+the middleware itself around an ASGI app that answers immediately, against
+that app alone.
+"""
+
+import argparse
+import asyncio
+import time
+
+from thaitravel.core import metrics
+
+
+class Route:
+    path = "/v1/province_tax/register"
+
+
+async def bare_app(scope, receive, send):
+    scope["route"] = Route
+    await send({"type": "http.response.start", "status": 201, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+def bench_record(calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        metrics.http_request_duration.observe(0.003, "POST", Route.path)
+        metrics.http_responses.inc("POST", Route.path, "201")
+    return (time.perf_counter() - started) / calls
+
+
+async def bench_app(app, calls: int) -> float:
+    scope = {"type": "http", "method": "POST", "path": Route.path}
+    started = time.perf_counter()
+    for _ in range(calls):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"observe() + inc():        {bench_record(args.calls) * 1e6:6.2f}us")
+    bare = asyncio.run(bench_app(bare_app, args.calls))
+    wrapped = asyncio.run(bench_app(metrics.MetricsMiddleware(bare_app), args.calls))
+    print(f"bare ASGI app:            {bare * 1e6:6.2f}us")
+    print(f"with MetricsMiddleware:   {wrapped * 1e6:6.2f}us")
+    print(f"middleware overhead:      {(wrapped - bare) * 1e6:6.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark the vectorized quote engine against a per-itinerary loop.
+
+Usage: poetry run python scripts/bench_quote_engine.py [--sizes 1 1000 1000000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from thaitravel.core import quote_engine
+
+
+def loop_quote(taxes: list[float], main, secondary, travellers, nights) -> list[float]:
+    """What looking rates up one itinerary at a time costs, without the database."""
+    totals = []
+    for m, s, t, n in zip(main, secondary, travellers, nights):
+        total = taxes[m] * t * n
+        if s != quote_engine.NO_PROVINCE:
+            total += taxes[s] * t * n
+        totals.append(total)
+    return totals
+
+
+def best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 1000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    provinces = len(quote_engine.PROVINCES)
+    rates = rng.uniform(0, 10, provinces)
+    taxes = rates.tolist()
+
+    print(f"{'quotes':>10} {'vectorized':>14} {'per quote':>12} {'python loop':>14}")
+    for size in args.sizes:
+        main = rng.integers(0, provinces, size)
+        secondary = rng.integers(-1, provinces, size)
+        travellers = rng.integers(1, 10, size)
+        nights = rng.integers(1, 30, size)
+
+        vectorized = best_of(
+            args.repeat, quote_engine.quote, rates, main, secondary, travellers, nights
+        )
+        loop_args = [a.tolist() for a in (main, secondary, travellers, nights)]
+        loop = best_of(max(1, args.repeat // 2), loop_quote, taxes, *loop_args)
+        print(
+            f"{size:>10} {vectorized * 1e3:>12.3f}ms "
+            f"{vectorized / size * 1e9:>10.1f}ns {loop * 1e3:>12.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
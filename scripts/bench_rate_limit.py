@@ -0,0 +1,98 @@
+"""Overhead of the /v1/token admission control.
+
+Usage: poetry run python scripts/bench_rate_limit.py [--keys 1 100000] [--requests 2000]
+
+First times ``TokenBucketLimiter.acquire`` alone, cycling over ``--keys``
+distinct keys. Then times ``POST /v1/token`` for an unknown user (one indexed
+select, no bcrypt) with and without the limiter dependency, best of ``--rounds``.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchlib import format_summary, summarize
+from thaitravel import models
+from thaitravel.core import config, rate_limit
+from thaitravel.main import app
+from thaitravel.routers.v1 import authentication_router
+
+
+def bench_acquire(keys: int, calls: int) -> float:
+    limiter = rate_limit.TokenBucketLimiter(rate=1e9, burst=1e9, max_keys=keys)
+    names = [f"10.0.{i // 256}.{i % 256}" for i in range(keys)]
+    started = time.perf_counter()
+    for i in range(calls):
+        limiter.acquire(names[i % keys])
+    return (time.perf_counter() - started) / calls
+
+
+def token_route():
+    return next(route for route in app.routes if route.path == "/v1/token")
+
+
+async def bench_requests(requests: int, limited: bool) -> dict:
+    for limiter in (rate_limit.login_ip_limiter, rate_limit.login_account_limiter):
+        limiter.rate = limiter.burst = 1e9
+    # drop the limiter from the resolved route, dependency_overrides has a
+    # per-request cost of its own that would swamp the difference
+    dependant = token_route().dependant
+    saved = list(dependant.dependencies)
+    if not limited:
+        dependant.dependencies = [
+            sub for sub in saved if sub.call is not authentication_router.limit_login
+        ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = config.Settings(
+            SQLDB_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        )
+        await models.init_db(settings)
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench"
+            ) as client:
+                samples = []
+                for i in range(-requests // 10, requests):
+                    started = time.perf_counter()
+                    await client.post(
+                        "/v1/token", data={"username": f"nobody{i}", "password": "x"}
+                    )
+                    # the first tenth warms up the pools and caches
+                    if i >= 0:
+                        samples.append(time.perf_counter() - started)
+                return summarize(samples)
+        finally:
+            dependant.dependencies = saved
+            await models.close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, nargs="+", default=[1, 100_000])
+    parser.add_argument("--calls", type=int, default=500_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    for keys in args.keys:
+        per_call = bench_acquire(keys, args.calls)
+        print(f"acquire() over {keys:>7} keys: {per_call * 1e9:8.0f}ns")
+
+    # alternate the two so drift on the machine hits both alike
+    samples = {True: [], False: []}
+    for _ in range(args.rounds):
+        for limited in (True, False):
+            samples[limited].append(asyncio.run(bench_requests(args.requests, limited)))
+    for name, limited in (("/v1/token", True), ("/v1/token without limiter", False)):
+        best = min(samples[limited], key=lambda summary: summary["p50_ms"])
+        print(format_summary(name, best))
+
+
+if __name__ == "__main__":
+    main()
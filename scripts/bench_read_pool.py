@@ -0,0 +1,111 @@
+"""Read latency under concurrent write load, shared pool vs read-only pool.
+
+Usage: poetry run python scripts/bench_read_pool.py [--readers 32] [--writers 4]
+
+Readers run the ``GET /v1/province_tax/base`` query in a loop while writers
+insert registrations and commit one row at a time. The run is repeated with
+readers checking out connections from the read-write pool (the old
+behaviour) and from the read-only pool behind ``get_read_session``.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from sqlmodel import select
+
+from benchlib import format_summary, summarize
+from thaitravel import models
+from thaitravel.core import config
+
+
+async def seed(session_factory):
+    async with session_factory() as session:
+        for province in list(models.ProvinceEnum):
+            session.add(models.DBBaseProvinceTax(province=province, tax=5.0))
+        await session.commit()
+
+
+async def writer(stop: asyncio.Event, start_id: int, writes: list[int]):
+    user_id = start_id
+    while not stop.is_set():
+        async with models.async_session_factory() as session:
+            session.add(
+                models.DBRegisteredProvinceTax(
+                    user_id=user_id,
+                    name="bench",
+                    email="bench@example.com",
+                    main_province_id=1,
+                    main_province_tax=5.0,
+                )
+            )
+            await session.commit()
+        user_id += 1
+        writes.append(1)
+
+
+async def reader(stop: asyncio.Event, session_factory, samples: list[float]):
+    while not stop.is_set():
+        started = time.perf_counter()
+        async with session_factory() as session:
+            (await session.exec(select(models.DBBaseProvinceTax))).all()
+        samples.append(time.perf_counter() - started)
+
+
+async def run(args, use_read_pool: bool) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = config.Settings(
+            SQLDB_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}",
+            SQLDB_POOL_SIZE=args.pool_size,
+            SQLDB_MAX_OVERFLOW=0,
+            SQLDB_READ_POOL_SIZE=args.pool_size,
+            SQLDB_READ_MAX_OVERFLOW=0,
+        )
+        await models.init_db(settings)
+        try:
+            await seed(models.async_session_factory)
+            session_factory = (
+                models.read_session_factory
+                if use_read_pool
+                else models.async_session_factory
+            )
+
+            stop = asyncio.Event()
+            samples: list[float] = []
+            writes: list[int] = []
+            tasks = [
+                asyncio.create_task(writer(stop, i * 10_000_000, writes))
+                for i in range(args.writers)
+            ]
+            tasks += [
+                asyncio.create_task(reader(stop, session_factory, samples))
+                for _ in range(args.readers)
+            ]
+            await asyncio.sleep(args.duration)
+            stop.set()
+            await asyncio.gather(*tasks)
+            return summarize(samples), len(writes) / args.duration
+        finally:
+            await models.close_db()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=32)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds")
+    args = parser.parse_args()
+
+    for name, use_read_pool in (
+        ("shared read-write pool", False),
+        ("read-only pool", True),
+    ):
+        summary, writes_per_second = await run(args, use_read_pool)
+        print(f"{format_summary(name, summary)} writes/s={writes_per_second:.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""Small helpers shared by the benchmark scripts in this directory."""
+
+import json
+import statistics
+from pathlib import Path
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list[float]) -> dict:
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else float("nan"),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000 if samples else float("nan"),
+    }
+
+
+def format_summary(name: str, summary: dict) -> str:
+    return (
+        f"{name:<28} n={summary['count']:<7} "
+        f"p50={summary['p50_ms']:8.2f}ms p95={summary['p95_ms']:8.2f}ms "
+        f"p99={summary['p99_ms']:8.2f}ms max={summary['max_ms']:8.2f}ms"
+    )
+
+
+# compared by compare_to_baseline; throughput may only drop, the rest only rise
+HIGHER_IS_BETTER = ("req_per_s",)
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "sql_per_request")
+
+
+def save_baseline(path: str | Path, baseline: dict):
+    Path(path).write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def load_baseline(path: str | Path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+def error_rate(summary: dict) -> float:
+    return summary.get("errors", 0) / summary["count"] if summary["count"] else 0.0
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of ``results`` against ``baseline`` beyond ``tolerance``.
+
+    Both map a scenario name to its summary; scenarios missing from either
+    side are skipped. Any error fails a scenario whose baseline had none;
+    otherwise the error rate may rise by ``tolerance`` like the latencies.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for key in HIGHER_IS_BETTER:
+            if current[key] < previous[key] * (1 - tolerance):
+                regressions.append(
+                    f"{name}: {key} {current[key]:.2f} is below the baseline "
+                    f"{previous[key]:.2f} by more than {tolerance:.0%}"
+                )
+        for key in LOWER_IS_BETTER:
+            if current[key] > previous[key] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {key} {current[key]:.2f} is above the baseline "
+                    f"{previous[key]:.2f} by more than {tolerance:.0%}"
+                )
+        current_rate, previous_rate = error_rate(current), error_rate(previous)
+        if current_rate > previous_rate * (1 + tolerance):
+            regressions.append(
+                f"{name}: error rate {current_rate:.2%} is above the baseline "
+                f"{previous_rate:.2%}"
+                + (f" by more than {tolerance:.0%}" if previous_rate else "")
+            )
+    return regressions
@@ -0,0 +1,206 @@
+"""Fill a fresh SQLite database with a seeded synthetic dataset.
+
+Usage: poetry run python scripts/generate_dataset.py dataset.db
+           [--users 10000] [--registrations 10000] [--seed 0]
+
+Writes every ``ProvinceEnum`` tax row, ``--users`` users and
+``--registrations`` registrations with executemany core INSERTs of
+``--batch-size`` rows, then rebuilds ``province_tax_summary``. User 1 is
+``admin`` with the admin role; every user's password is ``--password``,
+hashed once with ``--bcrypt-rounds``. The same seed gives the same rows;
+only the bcrypt salt differs between runs.
+
+Registration ``k`` belongs to the user and main province given by
+``registration_slot(k, users)``, which never repeats a (user, province)
+pair, so at most users x provinces registrations fit. Slots from
+``--registrations`` on are free for writes.
+"""
+
+import argparse
+import asyncio
+import datetime
+import random
+import time
+from pathlib import Path
+
+import bcrypt
+from sqlalchemy import insert
+
+from thaitravel import models
+from thaitravel.core import config
+
+FIRST_NAMES = (
+    "Somchai",
+    "Somsak",
+    "Malee",
+    "Suda",
+    "Anong",
+    "Niran",
+    "Kanya",
+    "Prasert",
+)
+LAST_NAMES = ("Srisuk", "Chaiyaporn", "Wongsa", "Thongdee", "Rattana", "Boonmee")
+BASE_DATE = datetime.datetime(2024, 1, 1)
+YEAR = 365 * 24 * 60 * 60
+PROVINCE_NAMES = list(models.ProvinceEnum)
+PROVINCES = len(PROVINCE_NAMES)
+
+
+def registration_slot(k: int, users: int) -> tuple[int, int]:
+    """User id and main province id of the ``k``-th registration."""
+    round_, user_index = divmod(k, users)
+    user_id = user_index + 1
+    # spread each round over the provinces instead of filling province 1 first
+    province_index = (round_ + user_id * 31) % PROVINCES
+    return user_id, province_index + 1
+
+
+def province_rows(rng: random.Random) -> list[dict]:
+    return [
+        {"id": i, "province": province, "tax": round(rng.uniform(1, 20), 2)}
+        for i, province in enumerate(PROVINCE_NAMES, start=1)
+    ]
+
+
+def user_rows(rng: random.Random, start: int, stop: int, password: str) -> list[dict]:
+    rows = []
+    for user_id in range(start, stop):
+        registered = BASE_DATE + datetime.timedelta(seconds=rng.randrange(YEAR))
+        username = "admin" if user_id == 1 else f"user{user_id}"
+        rows.append(
+            {
+                "id": user_id,
+                "email": f"{username}@example.com",
+                "username": username,
+                "first_name": rng.choice(FIRST_NAMES),
+                "last_name": rng.choice(LAST_NAMES),
+                "province": rng.choice(PROVINCE_NAMES),
+                "password": password,
+                "roles": ["user", "admin"] if user_id == 1 else ["user"],
+                "status": "active",
+                "register_date": registered,
+                "updated_date": registered,
+            }
+        )
+    return rows
+
+
+def registration_rows(
+    rng: random.Random, start: int, stop: int, users: int, taxes: dict[int, float]
+) -> list[dict]:
+    rows = []
+    for k in range(start, stop):
+        user_id, main_id = registration_slot(k, users)
+        secondary_id = None
+        if rng.random() < 0.5:
+            secondary_id = (main_id - 1 + rng.randrange(1, PROVINCES)) % PROVINCES + 1
+        rows.append(
+            {
+                "user_id": user_id,
+                "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "email": f"user{user_id}@example.com",
+                "main_province_id": main_id,
+                "main_province_tax": taxes[main_id],
+                "secondary_province_id": secondary_id,
+                "secondary_province_tax": taxes.get(secondary_id),
+                "register_date": BASE_DATE
+                + datetime.timedelta(seconds=rng.randrange(YEAR)),
+            }
+        )
+    return rows
+
+
+async def insert_batches(conn, table, total: int, batch_size: int, make_rows):
+    started = time.perf_counter()
+    for start in range(0, total, batch_size):
+        stop = min(start + batch_size, total)
+        await conn.execute(insert(table), make_rows(start, stop))
+        await conn.commit()
+        elapsed = time.perf_counter() - started
+        print(
+            f"\r{table.name}: {stop:,}/{total:,} rows, {stop / elapsed:,.0f} rows/s",
+            end="",
+            flush=True,
+        )
+    print()
+
+
+async def generate(
+    path: Path,
+    users: int,
+    registrations: int,
+    seed: int = 0,
+    batch_size: int = 10_000,
+    password: str = "password",
+    bcrypt_rounds: int = 12,
+):
+    if registrations > users * PROVINCES:
+        raise ValueError(f"At most {users * PROVINCES} registrations fit {users} users")
+
+    rng = random.Random(seed)
+    hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt(bcrypt_rounds)).decode()
+    await models.init_db(config.Settings(SQLDB_URL=f"sqlite+aiosqlite:///{path}"))
+    try:
+        async with models.engine.connect() as conn:
+            provinces = province_rows(rng)
+            await conn.execute(insert(models.DBBaseProvinceTax.__table__), provinces)
+            await conn.commit()
+            taxes = {row["id"]: row["tax"] for row in provinces}
+
+            await insert_batches(
+                conn,
+                models.DBUser.__table__,
+                users,
+                batch_size,
+                lambda start, stop: user_rows(rng, start + 1, stop + 1, hashed),
+            )
+            await insert_batches(
+                conn,
+                models.DBRegisteredProvinceTax.__table__,
+                registrations,
+                batch_size,
+                lambda start, stop: registration_rows(rng, start, stop, users, taxes),
+            )
+
+        async with models.engine.begin() as conn:
+            await models.province_tax_summary.rebuild(conn)
+            await conn.exec_driver_sql("ANALYZE")
+    finally:
+        await models.close_db()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("database", type=Path, help="SQLite file to create")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--registrations", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--force", action="store_true", help="replace the file")
+    args = parser.parse_args()
+
+    if args.registrations > args.users * PROVINCES:
+        parser.error(f"--registrations can be at most {PROVINCES} x --users")
+    if args.database.exists():
+        if not args.force:
+            parser.error(f"{args.database} exists, use --force to replace it")
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{args.database}{suffix}").unlink(missing_ok=True)
+
+    started = time.perf_counter()
+    await generate(
+        args.database,
+        args.users,
+        args.registrations,
+        seed=args.seed,
+        batch_size=args.batch_size,
+        password=args.password,
+        bcrypt_rounds=args.bcrypt_rounds,
+    )
+    print(f"Generated {args.database} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""Stream an NDJSON file of province tax registrations to the import endpoint.
+
+Usage:
+    poetry run python scripts/import_registrations.py registrations.ndjson \
+        --username admin --password password [--batch-size 500]
+
+Each line of the file is a ``RegisterProvinceTaxRequest``. ``-`` reads from
+stdin. Per-line results are written to stdout as NDJSON as they arrive and
+the summary to stderr. The file is sent in chunks, so memory stays flat for
+any file size.
+"""
+
+import argparse
+import json
+import sys
+
+import httpx
+
+
+def read_chunks(file, chunk_size: int = 64 * 1024):
+    while chunk := file.read(chunk_size):
+        yield chunk
+
+
+def get_token(client: httpx.Client, username: str, password: str) -> str:
+    response = client.post(
+        "/v1/token", data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file", help="NDJSON file, or - for stdin")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", help="bearer token, instead of username/password")
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds")
+    args = parser.parse_args()
+
+    if not args.token and not (args.username and args.password):
+        parser.error("either --token or --username and --password are required")
+
+    with httpx.Client(base_url=args.url, timeout=args.timeout) as client:
+        token = args.token or get_token(client, args.username, args.password)
+        params = {"batch_size": args.batch_size} if args.batch_size else {}
+
+        file = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+        failed = 0
+        with (
+            file,
+            client.stream(
+                "POST",
+                "/v1/province_tax/register/import",
+                params=params,
+                content=read_chunks(file),
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": "application/x-ndjson",
+                },
+            ) as response,
+        ):
+            if response.is_error:
+                response.read()
+                print(f"{response.status_code}: {response.text}", file=sys.stderr)
+                return 1
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                result = json.loads(line)
+                if "summary" in result:
+                    print(json.dumps(result["summary"]), file=sys.stderr)
+                    continue
+                if result["status"] != "created":
+                    failed += 1
+                print(line)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
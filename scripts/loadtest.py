@@ -0,0 +1,332 @@
+"""HTTP load test of ``thaitravel.main:app``: throughput, tail latency, SQL.
+
+Usage: poetry run python scripts/loadtest.py [--scenario users_me ...]
+           [--concurrency 16] [--duration 10] [--transport asgi|socket]
+           [--save-baseline FILE] [--baseline FILE --tolerance 0.2]
+
+Each scenario runs ``--concurrency`` clients in a closed loop for
+``--duration`` seconds after a ``--warmup``. ``asgi`` drives the app
+in-process through ``httpx.ASGITransport``; ``socket`` starts uvicorn in a
+subprocess and goes through a real TCP socket and HTTP parsing. Both run the
+app lifespan, on a fresh SQLite file seeded with every province and
+``--users`` accounts.
+
+SQL statements per request are read from the ``Server-Timing`` header, so
+``REQUEST_TIMING_ENABLED`` must stay on. With ``--baseline`` the run exits
+with status 1 when a scenario's req/s drops, or its p50/p95/p99 or SQL per
+request rises, by more than ``--tolerance`` against the saved baseline, and
+when its error rate rises likewise or it fails at all where the baseline did
+not. A 409 is the expected answer to a registration slot that is already
+taken, so it counts as a conflict rather than an error. Baselines are only
+comparable on the same machine, transport and concurrency.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import itertools
+import logging
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+WORKDIR = tempfile.TemporaryDirectory(prefix="thaitravel-loadtest-")
+
+# settings are read when thaitravel is imported, and by the uvicorn subprocess
+os.environ.update(
+    {
+        "SQLDB_URL": f"sqlite+aiosqlite:///{Path(WORKDIR.name) / 'loadtest.db'}",
+        "REQUEST_TIMING_ENABLED": "true",
+        # the whole load comes from one address and a few hundred accounts
+        "LOGIN_RATE_PER_IP": "1e9",
+        "LOGIN_BURST_PER_IP": "1000000000",
+        "LOGIN_RATE_PER_ACCOUNT": "1e9",
+        "LOGIN_BURST_PER_ACCOUNT": "1000000000",
+    }
+)
+
+from benchlib import (  # noqa: E402
+    compare_to_baseline,
+    format_summary,
+    load_baseline,
+    save_baseline,
+    summarize,
+)
+from thaitravel import models  # noqa: E402
+from thaitravel.core import password_hashing, security  # noqa: E402
+from thaitravel.main import app  # noqa: E402
+
+PASSWORD = "password"
+SQL_QUERIES = re.compile(r'desc="(\d+) queries')
+
+
+@dataclasses.dataclass
+class Context:
+    users: list[tuple[int, str]]
+    headers: list[dict]
+    province_ids: list[int]
+    registrations: itertools.count = dataclasses.field(default_factory=itertools.count)
+
+
+async def seed(users: int) -> Context:
+    """Provinces and ``users`` accounts sharing one password, hashed once."""
+    await models.init_db()
+    try:
+        async with models.async_session_factory() as session:
+            provinces = [
+                models.DBBaseProvinceTax(province=province, tax=5.0 + i % 10)
+                for i, province in enumerate(models.ProvinceEnum)
+            ]
+            password = await password_hashing.hasher.hash(PASSWORD)
+            accounts = [
+                models.DBUser(
+                    email=f"load{i}@example.com",
+                    username=f"load{i}",
+                    first_name="Load",
+                    last_name=f"Test{i}",
+                    province=provinces[i % len(provinces)].province,
+                    password=password,
+                )
+                for i in range(users)
+            ]
+            session.add_all(provinces + accounts)
+            await session.commit()
+            ids = [(account.id, account.username) for account in accounts]
+            province_ids = [province.id for province in provinces]
+    finally:
+        await models.close_db()
+
+    headers = [
+        {"Authorization": f"Bearer {security.create_access_token({'sub': id})}"}
+        for id, _ in ids
+    ]
+    return Context(users=ids, headers=headers, province_ids=province_ids)
+
+
+async def login(client: httpx.AsyncClient, ctx: Context, rng: random.Random):
+    _, username = rng.choice(ctx.users)
+    return await client.post(
+        "/v1/token", data={"username": username, "password": PASSWORD}
+    )
+
+
+async def users_me(client: httpx.AsyncClient, ctx: Context, rng: random.Random):
+    return await client.get("/v1/users/me", headers=rng.choice(ctx.headers))
+
+
+async def province_tax_base(
+    client: httpx.AsyncClient, ctx: Context, rng: random.Random
+):
+    return await client.get("/v1/province_tax/base")
+
+
+async def register(client: httpx.AsyncClient, ctx: Context, rng: random.Random):
+    # one registration per (user, province); after users x provinces writes
+    # the slots wrap around and come back as 409s, counted as conflicts
+    user, province = divmod(next(ctx.registrations), len(ctx.province_ids))
+    return await client.post(
+        "/v1/province_tax/register",
+        headers=ctx.headers[user % len(ctx.headers)],
+        json={
+            "name": "Load Test",
+            "email": "loadtest@example.com",
+            "main_province_id": ctx.province_ids[province],
+        },
+    )
+
+
+MIXED = {province_tax_base: 60, users_me: 30, register: 8, login: 2}
+
+
+async def mixed(client: httpx.AsyncClient, ctx: Context, rng: random.Random):
+    (step,) = rng.choices(list(MIXED), weights=list(MIXED.values()))
+    return await step(client, ctx, rng)
+
+
+SCENARIOS = {
+    "login": login,
+    "users_me": users_me,
+    "province_tax_base": province_tax_base,
+    "register": register,
+    "mixed": mixed,
+}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, ctx: Context, step, args: argparse.Namespace
+) -> dict:
+    samples: list[float] = []
+    queries: list[int] = []
+    errors = conflicts = 0
+    measuring = False
+    stopped = False
+
+    async def worker(seed: int):
+        nonlocal errors, conflicts
+        rng = random.Random(seed)
+        while not stopped:
+            started = time.perf_counter()
+            response = await step(client, ctx, rng)
+            elapsed = time.perf_counter() - started
+            if not measuring:
+                continue
+            samples.append(elapsed)
+            if response.status_code == 409:
+                conflicts += 1
+            elif response.status_code >= 400:
+                errors += 1
+            match = SQL_QUERIES.search(response.headers.get("server-timing", ""))
+            if match:
+                queries.append(int(match.group(1)))
+
+    tasks = [asyncio.create_task(worker(seed)) for seed in range(args.concurrency)]
+    await asyncio.sleep(args.warmup)
+    measuring = True
+    started = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    stopped = True
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - started
+
+    summary = summarize(samples)
+    summary["req_per_s"] = len(samples) / wall
+    summary["errors"] = errors
+    summary["conflicts"] = conflicts
+    summary["sql_per_request"] = sum(queries) / len(queries) if queries else 0.0
+    return summary
+
+
+@contextlib.asynccontextmanager
+async def asgi_client(args: argparse.Namespace):
+    async with app.router.lifespan_context(app):
+        await app.state.warmup
+        # an unhandled exception is a 500 to count, as over a socket
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest"
+        ) as client:
+            yield client
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def socket_client(args: argparse.Namespace):
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "thaitravel.main:app",
+            "--host=127.0.0.1",
+            f"--port={port}",
+            f"--workers={args.workers}",
+            "--log-level=warning",
+            "--no-access-log",
+        ],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+    )
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits
+        ) as client:
+            await wait_until_ready(client, server)
+            yield client
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, server: subprocess.Popen):
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+        with contextlib.suppress(httpx.TransportError):
+            if (await client.get("/health/ready")).status_code == 200:
+                return
+        await asyncio.sleep(0.1)
+    raise RuntimeError("uvicorn did not become ready within 60s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=SCENARIOS,
+        help="repeat to run several; default: all",
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--transport", choices=("asgi", "socket"), default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--baseline", metavar="FILE")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # one log line per request would drown the report
+    logging.getLogger("thaitravel").setLevel(logging.ERROR)
+
+    ctx = await seed(args.users)
+    client_factory = asgi_client if args.transport == "asgi" else socket_client
+    results = {}
+    async with client_factory(args) as client:
+        for name in args.scenario or SCENARIOS:
+            summary = await run_scenario(client, ctx, SCENARIOS[name], args)
+            results[name] = summary
+            print(
+                f"{format_summary(name, summary)} "
+                f"{summary['req_per_s']:8.1f} req/s "
+                f"sql/req={summary['sql_per_request']:.2f} "
+                f"errors={summary['errors']} conflicts={summary['conflicts']}"
+            )
+
+    run = {
+        "transport": args.transport,
+        "concurrency": args.concurrency,
+        "workers": args.workers if args.transport == "socket" else None,
+        "scenarios": results,
+    }
+    if args.save_baseline:
+        save_baseline(args.save_baseline, run)
+        print(f"Saved baseline to {args.save_baseline}")
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        for key in ("transport", "concurrency", "workers"):
+            if baseline[key] != run[key]:
+                sys.exit(f"Baseline was taken with {key}={baseline[key]!r}")
+        regressions = compare_to_baseline(
+            results, baseline["scenarios"], args.tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
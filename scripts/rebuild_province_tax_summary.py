@@ -0,0 +1,31 @@
+"""Recompute province_tax_summary from registered_province_tax.
+
+Usage: poetry run python scripts/rebuild_province_tax_summary.py
+
+The summary is maintained incrementally by the registration write paths; run
+this to repair it after rows were changed outside the API. The database is
+taken from Settings (SQLDB_URL).
+"""
+
+import asyncio
+
+from thaitravel import models
+
+
+async def main():
+    await models.init_db()
+    try:
+        async with models.engine.begin() as conn:
+            await models.province_tax_summary.rebuild(conn)
+            result = await conn.exec_driver_sql(
+                "SELECT COUNT(*), "
+                "COALESCE(SUM(main_registration_count), 0) FROM province_tax_summary"
+            )
+            provinces, registrations = result.one()
+        print(f"Rebuilt summary: {provinces} provinces, {registrations} registrations")
+    finally:
+        await models.close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
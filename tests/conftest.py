@@ -0,0 +1,8 @@
+# ✅ ให้ทุกไฟล์ใช้ fixture จาก test_base ได้โดยไม่ต้อง import เอง
+from .test_base import (  # noqa: F401
+    admin_headers,
+    auth_headers,
+    client,
+    prepare_database,
+    session,
+)
@@ -2,12 +2,14 @@ import pytest_asyncio
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlmodel import SQLModel
+from sqlmodel import SQLModel, select
 from httpx import AsyncClient
 import httpx
 
+from thaitravel.core.security import create_access_token
 from thaitravel.main import app
-from thaitravel.models import get_session
+from thaitravel.models import DBUser, get_session, get_session_factory
+from thaitravel.models import get_read_session, get_read_session_factory
 
 DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
@@ -39,6 +41,11 @@ async def client(session):  # ← ใช้ session ที่ประกาศ
         yield session
 
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_read_session] = get_session_override
+    app.dependency_overrides[get_read_session_factory] = (
+        lambda: AsyncTestingSessionLocal
+    )
+    app.dependency_overrides[get_session_factory] = lambda: AsyncTestingSessionLocal
 
     transport = httpx.ASGITransport(app=app)
     async with AsyncClient(
@@ -47,3 +54,38 @@ async def client(session):  # ← ใช้ session ที่ประกาศ
         yield client
 
     app.dependency_overrides.clear()
+
+
+async def bearer_headers(client: AsyncClient, session, username: str, roles=None):
+    """Headers of ``username``, created on first use, with ``roles`` if given."""
+    query = select(DBUser).where(DBUser.username == username)
+    user = (await session.exec(query)).first()
+    if user is None:
+        await client.post(
+            "/v1/users/create",
+            json={
+                "email": f"{username}@email.local",
+                "username": username,
+                "first_name": username.capitalize(),
+                "last_name": "Test",
+                "province": "Bangkok",
+                "password": "password",
+            },
+        )
+        user = (await session.exec(query)).one()
+    if roles is not None and user.roles != roles:
+        user.roles = roles
+        session.add(user)
+        await session.commit()
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.id})}"}
+
+
+# ✅ Header ของผู้ใช้ทั่วไป และของ admin
+@pytest_asyncio.fixture
+async def auth_headers(client, session):
+    return await bearer_headers(client, session, "member")
+
+
+@pytest_asyncio.fixture
+async def admin_headers(client, session):
+    return await bearer_headers(client, session, "manager", roles=["user", "admin"])
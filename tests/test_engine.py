@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import select
+
+from thaitravel import models
+from thaitravel.core import config
+
+
+@pytest.fixture
+def file_settings(tmp_path):
+    return config.Settings(SQLDB_URL=f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+
+
+@pytest.mark.asyncio
+async def test_init_db_uses_settings_and_pragmas(file_settings):
+    await models.init_db(file_settings)
+    try:
+        assert models.engine.url.database == file_settings.SQLDB_URL.split("///")[1]
+        assert models.engine.echo is False
+        assert models.engine.pool.size() == file_settings.SQLDB_POOL_SIZE
+
+        async with models.engine.connect() as conn:
+            journal_mode = (await conn.exec_driver_sql("PRAGMA journal_mode")).scalar()
+            synchronous = (await conn.exec_driver_sql("PRAGMA synchronous")).scalar()
+            busy_timeout = (await conn.exec_driver_sql("PRAGMA busy_timeout")).scalar()
+
+        assert journal_mode == "wal"
+        assert synchronous == 1  # NORMAL
+        assert busy_timeout == file_settings.SQLITE_BUSY_TIMEOUT
+    finally:
+        await models.close_db()
+
+
+@pytest.mark.asyncio
+async def test_get_session_reuses_factory(file_settings):
+    await models.init_db(file_settings)
+    try:
+        factory = models.async_session_factory
+        async for session in models.get_session():
+            assert (await session.exec(text("SELECT 1"))).scalar() == 1
+        async for session in models.get_session():
+            pass
+        assert models.async_session_factory is factory
+    finally:
+        await models.close_db()
+
+
+@pytest.mark.asyncio
+async def test_read_session_is_read_only(file_settings):
+    await models.init_db(file_settings)
+    try:
+        assert models.read_engine is not models.engine
+
+        async for session in models.get_session():
+            session.add(models.DBBaseProvinceTax(province="Chiang Mai", tax=7.5))
+            await session.commit()
+
+        async for session in models.get_read_session():
+            rows = (await session.exec(select(models.DBBaseProvinceTax))).all()
+            assert [row.province for row in rows] == ["Chiang Mai"]
+
+            with pytest.raises(OperationalError):
+                await session.exec(text("DELETE FROM provice_tax"))
+    finally:
+        await models.close_db()
+
+
+@pytest.mark.asyncio
+async def test_read_engine_quotes_the_path(tmp_path):
+    directory = tmp_path / "odd#name 100%"
+    directory.mkdir()
+    await models.init_db(
+        config.Settings(SQLDB_URL=f"sqlite+aiosqlite:///{directory / 'test.db'}")
+    )
+    try:
+        async for session in models.get_session():
+            session.add(models.DBBaseProvinceTax(province="Krabi", tax=1.0))
+            await session.commit()
+
+        async for session in models.get_read_session():
+            rows = (await session.exec(select(models.DBBaseProvinceTax))).all()
+            assert [row.province for row in rows] == ["Krabi"]
+    finally:
+        await models.close_db()
+
+
+@pytest.mark.asyncio
+async def test_memory_database_shares_engine():
+    await models.init_db(config.Settings(SQLDB_URL="sqlite+aiosqlite:///:memory:"))
+    try:
+        assert models.read_engine is models.engine
+    finally:
+        await models.close_db()
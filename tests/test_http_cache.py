@@ -0,0 +1,33 @@
+import pytest
+from httpx import AsyncClient
+
+from .test_base import auth_headers, client
+
+
+@pytest.mark.asyncio
+async def test_province_tax_base_not_modified(client: AsyncClient):
+    first = await client.get("/v1/province_tax/base")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "public, max-age=60"
+
+    second = await client.get("/v1/province_tax/base", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+    stale = await client.get(
+        "/v1/province_tax/base", headers={"If-None-Match": '"stale"'}
+    )
+    assert stale.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_users_me_not_modified(client: AsyncClient, auth_headers):
+    first = await client.get("/v1/users/me", headers=auth_headers)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    second = await client.get(
+        "/v1/users/me", headers={**auth_headers, "If-None-Match": f"W/{etag}"}
+    )
+    assert second.status_code == 304
@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+from httpx import AsyncClient
+
+from thaitravel.core import metrics
+
+from .test_base import client, session, prepare_database
+
+
+def test_histogram_and_counter_render():
+    registry = metrics.Registry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), (0.1, 1.0))
+    errors = registry.counter("errors", "Errors.", ("code",))
+    registry.gauge("open", "Open things.", ("kind",), lambda: [(("a",), 3)])
+
+    latency.observe(0.05, "/x")
+    latency.observe(0.5, "/x")
+    latency.observe(5.0, "/x")
+    errors.inc('we"ird')
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{route="/x",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/x",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/x",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/x"} 3' in text
+    assert 'errors_total{code="we\\"ird"} 1' in text
+    assert 'open{kind="a"} 3' in text
+
+
+def test_multiprocess_snapshots_are_added_up(tmp_path):
+    registry = metrics.Registry(str(tmp_path))
+    requests = registry.counter("requests", "Requests.", ("route",))
+    requests.inc("/x", amount=2)
+    registry.write_snapshot()
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+
+    # another worker's file
+    (tmp_path / "1.json").write_text(json.dumps({"requests": {"/x": 3, "/y": 1}}))
+    (tmp_path / "2.json").write_text("{broken")
+
+    text = registry.render()
+    assert 'requests_total{route="/x"} 5' in text
+    assert 'requests_total{route="/y"} 1' in text
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_routes_by_template(client: AsyncClient):
+    await client.get("/v1/users/12345")
+    await client.get("/no/such/path")
+
+    resp = await client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    text = resp.text
+    assert (
+        'http_responses_total{method="GET",route="/v1/users/{user_id}",status="401"}'
+        in text
+    )
+    assert 'route="unmatched",status="404"' in text
+    assert "# TYPE http_request_duration_seconds histogram" in text
@@ -0,0 +1,113 @@
+import pytest
+from sqlmodel import SQLModel
+
+from thaitravel import models
+from thaitravel.models import migrations
+from thaitravel.core import config
+
+
+@pytest.fixture
+def file_settings(tmp_path):
+    return config.Settings(SQLDB_URL=f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+
+
+async def index_names(conn, table):
+    result = await conn.exec_driver_sql(f"PRAGMA index_list({table})")
+    return {row[1] for row in result}
+
+
+@pytest.mark.asyncio
+async def test_migrate_adds_indexes_to_existing_database(file_settings):
+    engine = models.db_engine.create_engine(file_settings)
+    try:
+        # a database created before the indexes existed
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+            await conn.exec_driver_sql("DROP INDEX ix_users_username")
+            await conn.exec_driver_sql("DROP INDEX ix_users_email")
+            await conn.exec_driver_sql(
+                "DROP INDEX ux_registered_province_tax_user_main"
+            )
+            await conn.exec_driver_sql("DROP INDEX ix_registered_province_tax_user_id")
+            await conn.exec_driver_sql("ALTER TABLE users DROP COLUMN roles")
+            await conn.exec_driver_sql("ALTER TABLE users DROP COLUMN status")
+            await conn.exec_driver_sql(
+                "INSERT INTO users (email, username, first_name, last_name, province, "
+                "password, register_date, updated_date) VALUES "
+                "('old@email.local', 'old', 'Old', 'User', 'BANGKOK', 'x', "
+                "'2024-01-01', '2024-01-01')"
+            )
+            assert set(await migrations.check_query_plans(conn)) == {
+                "login by username or email",
+                "registration duplicate check",
+                "registrations of user",
+            }
+
+        async with engine.begin() as conn:
+            applied = await migrations.migrate(conn)
+            assert [m.version for m in applied] == [
+                m.version for m in migrations.MIGRATIONS
+            ]
+            assert {"ix_users_username", "ix_users_email"} <= await index_names(
+                conn, "users"
+            )
+            assert "ux_registered_province_tax_user_main" in await index_names(
+                conn, "registered_province_tax"
+            )
+            assert await migrations.check_query_plans(conn) == {}
+
+            result = await conn.exec_driver_sql("SELECT roles, status FROM users")
+            assert result.one() == ('["user"]', "active")
+
+        async with engine.begin() as conn:
+            assert await migrations.migrate(conn) == []
+    finally:
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_init_db_records_schema_version(file_settings):
+    await models.init_db(file_settings)
+    try:
+        async with models.engine.connect() as conn:
+            assert (
+                await migrations.get_schema_version(conn)
+                == migrations.MIGRATIONS[-1].version
+            )
+    finally:
+        await models.close_db()
+
+
+def test_index_scan_is_not_an_index_search():
+    table = "registered_province_tax"
+    assert migrations.is_searched(
+        [f"SEARCH {table} USING COVERING INDEX ix_registered_province_tax_user_id"],
+        table,
+    )
+    assert not migrations.is_searched(
+        [f"SCAN {table} USING COVERING INDEX ix_registered_province_tax_user_id"],
+        table,
+    )
+    assert not migrations.is_searched([f"SCAN {table}"], table)
+
+
+@pytest.mark.asyncio
+async def test_migrate_refuses_duplicate_unique_keys(file_settings):
+    engine = models.db_engine.create_engine(file_settings)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+            await conn.exec_driver_sql("DROP INDEX ix_users_email")
+            for username in ("first", "second"):
+                await conn.exec_driver_sql(
+                    "INSERT INTO users (email, username, first_name, last_name, "
+                    "province, password, register_date, updated_date) VALUES "
+                    f"('same@email.local', '{username}', 'A', 'B', 'BANGKOK', 'x', "
+                    "'2024-01-01', '2024-01-01')"
+                )
+
+        with pytest.raises(RuntimeError, match="same@email.local"):
+            async with engine.begin() as conn:
+                await migrations.migrate(conn)
+    finally:
+        await engine.dispose()
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from thaitravel.core import password_hashing
+
+from .test_base import auth_headers, client
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_saturated():
+    hasher = password_hashing.PasswordHasher(workers=1, max_pending=1)
+    try:
+        hashed = await hasher.hash("password")
+        assert await hasher.verify("password", hashed)
+        assert not await hasher.verify("wrong", hashed)
+
+        results = await asyncio.gather(
+            hasher.verify("password", hashed),
+            hasher.verify("password", hashed),
+            return_exceptions=True,
+        )
+        assert results[0] is True
+        assert isinstance(results[1], password_hashing.PasswordHasherBusy)
+        assert hasher.stats.rejected == 1
+        assert hasher.stats.completed == 4
+        assert hasher.stats.pending == 0
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_login_returns_503_when_hasher_is_busy(
+    client: AsyncClient, auth_headers, monkeypatch: pytest.MonkeyPatch
+):
+    # auth_headers has created the member account
+    monkeypatch.setattr(password_hashing.hasher, "max_pending", 0)
+
+    resp = await client.post(
+        "/v1/token", data={"username": "member", "password": "password"}
+    )
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from httpx import AsyncClient
+
+from thaitravel.core import profiling
+
+from .test_base import admin_headers, auth_headers, client
+
+
+def busy_work(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_sampler_collects_collapsed_stacks(monkeypatch):
+    async def app(scope, receive, send):
+        busy_work(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def allow(scope):
+        return True
+
+    monkeypatch.setattr(profiling, "is_admin", allow)
+    monkeypatch.setattr(profiling, "store", profiling.ProfileStore(5))
+    middleware = profiling.ProfilingMiddleware(app, interval=0.001)
+    transport = httpx.ASGITransport(app=middleware)
+    async with AsyncClient(transport=transport, base_url="http://x") as client:
+        plain = await client.get("/work")
+        profiled = await client.get("/work", headers={"X-Profile": "1"})
+
+    assert "x-profile-id" not in plain.headers
+    profile = profiling.store.get(int(profiled.headers["x-profile-id"]))
+    assert profile.status_code == 200
+    assert profile.samples > 0
+    assert "test_profiling:busy_work" in profile.collapsed()
+    stack, count = profile.collapsed().splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert len(profiling.store.profiles) == 1
+    assert profiling.store.active is False
+
+
+@pytest.mark.asyncio
+async def test_one_profile_at_a_time(monkeypatch):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def slow_allow(scope):
+        await asyncio.sleep(0.01)
+        return True
+
+    monkeypatch.setattr(profiling, "is_admin", slow_allow)
+    monkeypatch.setattr(profiling, "store", profiling.ProfileStore(5))
+    transport = httpx.ASGITransport(app=profiling.ProfilingMiddleware(app))
+    async with AsyncClient(transport=transport, base_url="http://x") as client:
+        responses = await asyncio.gather(
+            *(client.get("/", headers={"X-Profile": "1"}) for _ in range(2))
+        )
+
+    assert [r.status_code for r in responses] == [200, 200]
+    assert sum("x-profile-id" in r.headers for r in responses) == 1
+    assert len(profiling.store.profiles) == 1
+    assert profiling.store.active is False
+
+
+def test_store_keeps_last_profiles():
+    store = profiling.ProfileStore(2)
+    for _ in range(3):
+        store.add(profiling.Profile(store.next_id(), "GET", "/", None, 0.001))
+    assert [profile.id for profile in store.profiles] == [2, 3]
+    assert store.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_only_admins_can_profile(
+    client: AsyncClient, auth_headers, admin_headers
+):
+    as_user = await client.get(
+        "/v1/users/me", headers={**auth_headers, "X-Profile": "1"}
+    )
+    assert as_user.status_code == 200
+    assert "x-profile-id" not in as_user.headers
+    forbidden = await client.get("/v1/admin/profiles", headers=auth_headers)
+    assert forbidden.status_code == 403
+
+    headers = {**admin_headers, "X-Profile": "1"}
+    as_admin = await client.get("/v1/users/me", headers=headers)
+    assert as_admin.status_code == 200
+    profile_id = as_admin.headers["x-profile-id"]
+
+    listing = await client.get("/v1/admin/profiles", headers=headers)
+    [summary] = [p for p in listing.json()["profiles"] if str(p["id"]) == profile_id]
+    assert summary["route"] == "/v1/users/me"
+    assert summary["status_code"] == 200
+
+    report = await client.get(f"/v1/admin/profiles/{profile_id}", headers=headers)
+    assert report.status_code == 200
+    assert report.headers["content-type"].startswith("text/plain")
+
+    missing = await client.get("/v1/admin/profiles/0", headers=headers)
+    assert missing.status_code == 404
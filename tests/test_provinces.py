@@ -9,7 +9,9 @@ from sqlalchemy.orm import sessionmaker
 
 import os
 from dotenv import load_dotenv
-from .test_base import client, session, prepare_database, create_async_engine
+from sqlalchemy import event
+
+from .test_base import admin_headers, auth_headers, client, create_async_engine, engine
 
 settings = config.get_settings()
 
@@ -102,3 +104,90 @@ async def test_province_tax_crud(client: AsyncClient, user_data):
     assert reg_list_resp.status_code == 200
     reg_list = reg_list_resp.json()
     assert any(r["id"] == reg["id"] for r in reg_list)
+
+
+@pytest.mark.asyncio
+async def test_register_province_tax_duplicate(
+    client: AsyncClient, auth_headers, admin_headers
+):
+    province = (
+        await client.put(
+            "/v1/province_tax/base/bulk",
+            json=[{"province": "Lampang", "tax": 6.0}],
+            headers=admin_headers,
+        )
+    ).json()[0]
+    await client.get("/v1/province_tax/base")
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    reg_data = {
+        "name": "Lampang Company",
+        "email": "lampang@company.com",
+        "main_province_id": province["id"],
+    }
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        reg_resp = await client.post(
+            "/v1/province_tax/register", json=reg_data, headers=auth_headers
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    assert reg_resp.status_code == 201
+    assert reg_resp.json()["main_province_tax"] == 6.0
+    # the INSERT ... RETURNING and the summary upsert, the user is cached
+    assert len(statements) == 2
+    assert "RETURNING" in statements[0]
+    assert statements[1].startswith("INSERT INTO province_tax_summary")
+
+    dup_resp = await client.post(
+        "/v1/province_tax/register", json=reg_data, headers=auth_headers
+    )
+    assert dup_resp.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_registered_province_tax_keyset_pages(
+    client: AsyncClient, auth_headers, admin_headers
+):
+    provinces = (
+        await client.put(
+            "/v1/province_tax/base/bulk",
+            json=[{"province": "Nan", "tax": 1.0}, {"province": "Phrae", "tax": 1.0}],
+            headers=admin_headers,
+        )
+    ).json()
+    for province in provinces:
+        await client.post(
+            "/v1/province_tax/register",
+            json={
+                "name": "Paged Company",
+                "email": "paged@company.com",
+                "main_province_id": province["id"],
+            },
+            headers=auth_headers,
+        )
+
+    seen = []
+    params = {"limit": 1}
+    while True:
+        resp = await client.get(
+            "/v1/province_tax/registered", params=params, headers=auth_headers
+        )
+        assert resp.status_code == 200
+        page = resp.json()
+        assert len(page) <= 1
+        seen += [r["id"] for r in page]
+        if "x-next-cursor" not in resp.headers:
+            break
+        params["cursor"] = resp.headers["x-next-cursor"]
+
+    everything = (
+        await client.get("/v1/province_tax/registered", headers=auth_headers)
+    ).json()
+    assert seen == sorted(seen) == [r["id"] for r in everything]
+    assert len(seen) >= 2
@@ -0,0 +1,50 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from thaitravel.core import rate_limit
+
+from .test_base import client, engine, session, prepare_database
+
+
+def test_token_bucket_refills():
+    limiter = rate_limit.TokenBucketLimiter(rate=1.0, burst=2, max_keys=2)
+    assert limiter.acquire("a", now=0.0) == 0
+    assert limiter.acquire("a", now=0.0) == 0
+    assert limiter.acquire("a", now=0.0) == pytest.approx(1.0)
+    assert limiter.acquire("a", now=0.5) == pytest.approx(0.5)
+    assert limiter.acquire("a", now=1.0) == 0
+    assert limiter.rejected == 2
+
+    limiter.acquire("b", now=1.0)
+    limiter.acquire("c", now=1.0)
+    assert len(limiter) == 2
+
+
+@pytest.mark.asyncio
+async def test_login_over_limit_is_rejected_before_any_query(
+    client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setattr(
+        rate_limit,
+        "login_account_limiter",
+        rate_limit.TokenBucketLimiter(rate=0.01, burst=1, max_keys=10),
+    )
+    form = {"username": "Nobody", "password": "wrong"}
+    first = await client.post("/v1/token", data=form)
+    assert first.status_code == 401
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        limited = await client.post("/v1/token", data=form | {"username": " nobody "})
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+    assert statements == []
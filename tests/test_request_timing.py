@@ -0,0 +1,81 @@
+import json
+import logging
+import re
+
+import httpx
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+
+from thaitravel.core import request_timing
+
+from .test_base import admin_headers, auth_headers, client, engine
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_counts_queries(client: AsyncClient, auth_headers):
+    create_resp = await client.post(
+        "/v1/users/create",
+        json={
+            "email": "timing@email.local",
+            "username": "timing",
+            "first_name": "Timing",
+            "last_name": "Test",
+            "province": "Bangkok",
+            "password": "password",
+        },
+    )
+    assert 'rows fetched, 1 rows written"' in create_resp.headers["server-timing"]
+    token_resp = await client.post(
+        "/v1/token", data={"username": "timing", "password": "password"}
+    )
+    server_timing = token_resp.headers["server-timing"]
+    assert "db;dur=" in server_timing
+    # the login looks up one user
+    assert 'desc="1 queries, 1 rows fetched, 0 rows written"' in server_timing
+    assert "total;dur=" in server_timing
+
+    me = await client.get("/v1/users/me", headers=auth_headers)
+    assert "auth;dur=" in me.headers["server-timing"]
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header_times_serialization(
+    client: AsyncClient, admin_headers
+):
+    resp = await client.get("/v1/users", params={"limit": 1}, headers=admin_headers)
+    assert resp.status_code == 200
+    server_timing = resp.headers["server-timing"]
+    assert "serialize;dur=" in server_timing
+    # a page of one plus the row that tells whether there is a next one
+    fetched = re.search(r"(\d+) rows fetched", server_timing)
+    assert int(fetched.group(1)) >= 2
+
+
+@pytest.mark.asyncio
+async def test_query_threshold_flags_request(
+    prepare_database, caplog: pytest.LogCaptureFixture
+):
+    async def app(scope, receive, send):
+        async with engine.connect() as conn:
+            for _ in range(3):
+                (await conn.execute(text("SELECT 1"))).all()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = request_timing.RequestTimingMiddleware(app, query_threshold=2)
+    transport = httpx.ASGITransport(app=middleware)
+    with caplog.at_level(logging.INFO, logger=request_timing.__name__):
+        async with AsyncClient(transport=transport, base_url="http://x") as client:
+            resp = await client.get("/n-plus-one")
+
+    assert 'desc="3 queries, 3 rows fetched, 0 rows written"' in (
+        resp.headers["server-timing"]
+    )
+    [record] = caplog.records
+    assert record.levelno == logging.WARNING
+    line = json.loads(record.getMessage())
+    assert line["path"] == "/n-plus-one"
+    assert line["queries"] == 3
+    assert line["rows_fetched"] == 3
+    assert line["too_many_queries"] is True
@@ -0,0 +1,48 @@
+import datetime
+
+import jwt
+import pytest
+
+from thaitravel.core import security
+
+
+def test_decode_token_reuses_verified_claims(monkeypatch):
+    security.verified_tokens.clear()
+    token = security.create_access_token({"sub": 7})
+    assert security.decode_token(token)["sub"] == "7"
+    assert len(security.verified_tokens) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("verified again")
+
+    monkeypatch.setattr(jwt, "decode", fail)
+    payload = security.decode_token(token)
+    payload["sub"] = 7
+    assert security.decode_token(token)["sub"] == "7"
+
+
+def test_decode_token_rejects_expired_and_tampered_tokens():
+    security.verified_tokens.clear()
+    expired = security.create_access_token(
+        {"sub": 7}, expires_delta=datetime.timedelta(seconds=-1)
+    )
+    with pytest.raises(security.InvalidTokenError):
+        security.decode_token(expired)
+
+    token = security.create_access_token({"sub": 7})
+    with pytest.raises(security.InvalidTokenError):
+        security.decode_token(token[:-2] + ("AA" if token[-2:] != "AA" else "BB"))
+    assert len(security.verified_tokens) == 0
+
+
+def test_verified_token_cache_drops_entries_at_exp():
+    cache = security.VerifiedTokenCache(max_entries=2)
+    cache.put(b"expired", {"exp": 1})
+    assert cache.get(b"expired") is None
+    assert len(cache) == 0
+
+    far = datetime.datetime(2999, 1, 1).timestamp()
+    for key in (b"a", b"b", b"c"):
+        cache.put(key, {"exp": far})
+    assert cache.get(b"a") is None
+    assert cache.get(b"c") == {"exp": far}
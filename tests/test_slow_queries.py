@@ -0,0 +1,107 @@
+import json
+import logging
+
+import httpx
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+
+from thaitravel.core import request_timing
+from thaitravel.core import slow_queries
+
+from .test_base import admin_headers, auth_headers, client, engine
+
+
+def test_normalize_folds_literals_and_lists():
+    assert (
+        slow_queries.normalize(
+            "SELECT *\n  FROM user WHERE id IN (?, ?, ?) AND n = 'x'"
+        )
+        == "SELECT * FROM user WHERE id IN (...) AND n = ?"
+    )
+    assert (
+        slow_queries.normalize("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)")
+        == "INSERT INTO t (a, b) VALUES (?, ?), ..."
+    )
+    assert slow_queries.normalize("SELECT 1 LIMIT 20") == "SELECT ? LIMIT ?"
+
+
+def test_parameter_shape_hides_values():
+    assert slow_queries.parameter_shape((1, "secret"), False) == "(int, str)"
+    assert slow_queries.parameter_shape([(1, "a"), (2, "b")], True) == "2 x (int, str)"
+    assert slow_queries.parameter_shape({"id": 1}, False) == "{id: int}"
+
+
+def test_sampled_calls_are_scaled_to_estimates():
+    recorder = slow_queries.SlowQueryRecorder(
+        threshold=1.0, sample_rate=0.25, max_statements=100, explain=False
+    )
+    for seconds in (0.5, 1.5):
+        recorder.record(None, "SELECT 1", (), False, seconds)
+
+    [stats] = recorder.top(1)
+    assert stats.sampled_calls == 2
+    assert stats.calls == 8
+    assert stats.total_seconds == 8.0
+    assert stats.slow_calls == 4
+    assert stats.max_seconds == 1.5
+
+
+@pytest.mark.asyncio
+async def test_slow_statement_logged_with_route_and_plan(
+    prepare_database, monkeypatch, caplog: pytest.LogCaptureFixture
+):
+    recorder = slow_queries.SlowQueryRecorder(
+        threshold=0, sample_rate=1.0, max_statements=100, explain=True
+    )
+    monkeypatch.setattr(slow_queries, "recorder", recorder)
+
+    async def app(scope, receive, send):
+        scope["route"] = type("Route", (), {"path": "/items/{id}"})()
+        async with engine.connect() as conn:
+            for user_id in (1, 2):
+                await conn.execute(
+                    text("SELECT username FROM users WHERE id = :id"), {"id": user_id}
+                )
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    transport = httpx.ASGITransport(app=request_timing.RequestTimingMiddleware(app))
+    with caplog.at_level(logging.WARNING, logger=slow_queries.__name__):
+        async with AsyncClient(transport=transport, base_url="http://x") as client:
+            await client.get("/items/1")
+
+    [stats] = recorder.top(10)
+    assert stats.statement == "SELECT username FROM users WHERE id = ?"
+    assert stats.calls == 2
+    assert stats.slow_calls == 2
+    assert stats.last_route == "/items/{id}"
+    assert stats.parameter_shape == "(int)"
+    assert any("INTEGER PRIMARY KEY" in step for step in stats.plan)
+
+    lines = [json.loads(record.getMessage()) for record in caplog.records]
+    assert len(lines) == 2
+    assert lines[0]["slow_query"] == stats.statement
+    assert lines[0]["route"] == "/items/{id}"
+    assert "1" not in lines[0]["parameters"]
+
+
+@pytest.mark.asyncio
+async def test_admin_lists_top_queries(
+    client: AsyncClient, auth_headers, admin_headers
+):
+    forbidden = await client.get("/v1/admin/queries", headers=auth_headers)
+    assert forbidden.status_code == 403
+
+    response = await client.get(
+        "/v1/admin/queries", params={"limit": 3, "sort": "calls"}, headers=admin_headers
+    )
+    assert response.status_code == 200
+    queries = response.json()["queries"]
+    assert 0 < len(queries) <= 3
+    calls = [query["calls"] for query in queries]
+    assert calls == sorted(calls, reverse=True)
+
+    reset = await client.delete("/v1/admin/queries", headers=admin_headers)
+    assert reset.status_code == 204
+    assert len(slow_queries.recorder.statements) <= 2
@@ -0,0 +1,90 @@
+import asyncio
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from thaitravel import models
+from thaitravel.core import warmup
+from thaitravel.core.province_tax_cache import province_tax_table
+from thaitravel.main import app, lifespan
+
+# generous for a loaded CI runner, the point is to catch a heavy new import
+IMPORT_BUDGET_SECONDS = 5.0
+WARM_START_BUDGET_SECONDS = 2.0
+
+
+def test_import_time_budget():
+    code = (
+        "import time; started = time.perf_counter(); import thaitravel.main; "
+        "print(time.perf_counter() - started)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert float(result.stdout.strip()) < IMPORT_BUDGET_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_startup_skips_unchanged_schema_and_reports_ready(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLDB_URL", f"sqlite+aiosqlite:///{tmp_path / 'start.db'}")
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://x"
+        ) as client:
+            assert (await client.get("/health/ready")).status_code == 503
+
+            async with lifespan(app):
+                await app.state.warmup
+                assert (await client.get("/health/ready")).status_code == 200
+
+            create_all_calls = []
+
+            async def create_db_and_tables():
+                create_all_calls.append(1)
+
+            monkeypatch.setattr(models, "create_db_and_tables", create_db_and_tables)
+            started = time.perf_counter()
+            async with lifespan(app):
+                warm_start = time.perf_counter() - started
+                await app.state.warmup
+                assert (await client.get("/health/ready")).status_code == 200
+            assert create_all_calls == []
+            assert warm_start < WARM_START_BUDGET_SECONDS
+            assert (await client.get("/health/ready")).status_code == 503
+    finally:
+        # the lifespan loaded the province taxes of this throwaway database
+        province_tax_table.invalidate()
+
+
+@pytest.mark.asyncio
+async def test_not_ready_until_warm_up_finishes(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLDB_URL", f"sqlite+aiosqlite:///{tmp_path / 'warm.db'}")
+    warming = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def slow_warm_up():
+        warming.set()
+        await finish.wait()
+
+    monkeypatch.setattr(warmup, "warm_up", slow_warm_up)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://x"
+        ) as client:
+            async with lifespan(app):
+                await warming.wait()
+                starting = await client.get("/health/ready")
+                assert starting.status_code == 503
+                assert starting.json() == {"status": "starting"}
+                assert (await client.get("/health/live")).status_code == 200
+
+                finish.set()
+                await app.state.warmup
+                assert (await client.get("/health/ready")).status_code == 200
+    finally:
+        province_tax_table.invalidate()
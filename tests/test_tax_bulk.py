@@ -0,0 +1,54 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from .test_base import admin_headers, auth_headers, client, engine
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_base_province_tax(
+    client: AsyncClient, admin_headers, auth_headers
+):
+    resp = await client.put(
+        "/v1/province_tax/base/bulk",
+        json=[{"province": "Krabi", "tax": 4.0}],
+        headers=admin_headers,
+    )
+    assert resp.status_code == 200
+    assert resp.json()[0]["status"] == "created"
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        resp = await client.put(
+            "/v1/province_tax/base/bulk",
+            json=[
+                {"province": "Krabi", "tax": 4.5},
+                {"province": "Trang", "tax": 2.0},
+            ],
+            headers=admin_headers,
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+    assert resp.status_code == 200
+    statuses = {item["province"]: item["status"] for item in resp.json()}
+    assert statuses == {"Krabi": "updated", "Trang": "created"}
+    # the status comes from the writes, no read to race with
+    assert not [s for s in statements if s.startswith("SELECT") and "provice_tax" in s]
+
+    forbidden = await client.put(
+        "/v1/province_tax/base/bulk",
+        json=[{"province": "Krabi", "tax": 5.0}],
+        headers=auth_headers,
+    )
+    assert forbidden.status_code == 403
+
+    base_list = (await client.get("/v1/province_tax/base")).json()
+    taxes = {item["province"]: item["tax"] for item in base_list}
+    assert taxes["Krabi"] == 4.5
+    assert taxes["Trang"] == 2.0
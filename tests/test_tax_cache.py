@@ -0,0 +1,68 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+
+from thaitravel.core.province_tax_cache import province_tax_table
+
+from .test_base import auth_headers, client, engine
+
+
+@pytest.fixture
+def statements():
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+def province_tax_queries(statements: list[str]) -> list[str]:
+    return [s for s in statements if "FROM provice_tax" in s]
+
+
+@pytest.mark.asyncio
+async def test_base_list_is_served_from_cache(client: AsyncClient, statements):
+    await client.get("/v1/province_tax/base")
+    statements.clear()
+
+    resp = await client.get("/v1/province_tax/base")
+    assert resp.status_code == 200
+    assert province_tax_queries(statements) == []
+
+
+@pytest.mark.asyncio
+async def test_create_invalidates_cache(client: AsyncClient, auth_headers, statements):
+    await client.get("/v1/province_tax/base")
+    version = province_tax_table.version
+
+    resp = await client.post(
+        "/v1/province_tax/base",
+        json={"province": "Phuket", "tax": 3.0},
+        headers=auth_headers,
+    )
+    assert resp.status_code == 201
+    assert province_tax_table.version > version
+
+    statements.clear()
+    base_list = (await client.get("/v1/province_tax/base")).json()
+    assert any(b["province"] == "Phuket" for b in base_list)
+    assert len(province_tax_queries(statements)) == 1
+
+    # registration resolves the tax without another province query
+    phuket = next(b for b in base_list if b["province"] == "Phuket")
+    statements.clear()
+    reg_resp = await client.post(
+        "/v1/province_tax/register",
+        json={
+            "name": "Cache Company",
+            "email": "cache@company.com",
+            "main_province_id": phuket["id"],
+        },
+        headers=auth_headers,
+    )
+    assert reg_resp.status_code == 201
+    assert reg_resp.json()["main_province_tax"] == 3.0
+    assert province_tax_queries(statements) == []
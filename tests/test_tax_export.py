@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from .test_base import admin_headers, auth_headers, client
+
+
+@pytest.mark.asyncio
+async def test_export_registrations(client: AsyncClient, auth_headers, admin_headers):
+    forbidden = await client.get(
+        "/v1/province_tax/registered/export", headers=auth_headers
+    )
+    assert forbidden.status_code == 403
+
+    province = (
+        await client.put(
+            "/v1/province_tax/base/bulk",
+            json=[{"province": "Chumphon", "tax": 8.0}],
+            headers=admin_headers,
+        )
+    ).json()[0]
+    reg = (
+        await client.post(
+            "/v1/province_tax/register",
+            json={
+                "name": "Export Company",
+                "email": "export@company.com",
+                "main_province_id": province["id"],
+            },
+            headers=admin_headers,
+        )
+    ).json()
+
+    resp = await client.get(
+        "/v1/province_tax/registered/export",
+        params={"province": "Chumphon"},
+        headers=admin_headers,
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(resp.text)))
+    assert [int(row["id"]) for row in rows] == [reg["id"]]
+    assert float(rows[0]["main_province_tax"]) == 8.0
+
+    resp = await client.get(
+        "/v1/province_tax/registered/export",
+        params={"format": "ndjson", "province": "Chumphon"},
+        headers=admin_headers,
+    )
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert [line["id"] for line in lines] == [reg["id"]]
+
+    resp = await client.get(
+        "/v1/province_tax/registered/export",
+        params={"format": "ndjson", "date_to": "2000-01-01T00:00:00"},
+        headers=admin_headers,
+    )
+    assert resp.text == ""
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import pytest
+from httpx import AsyncClient
+
+from thaitravel.core import registration_import
+from thaitravel.main import app
+
+from .test_base import admin_headers, auth_headers, client
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_splits_across_chunks():
+    lines = [
+        line
+        async for line in registration_import.iter_lines(
+            chunks(b'{"a":', b'1}\n\n{"b"', b":2}\n" + b"x" * 20 + b"\nlast"),
+            max_line_bytes=10,
+        )
+    ]
+    assert lines == [b'{"a":1}', b"", b'{"b":2}', None, b"last"]
+
+
+@pytest.mark.asyncio
+async def test_import_registrations(client: AsyncClient, auth_headers, admin_headers):
+    provinces = (
+        await client.put(
+            "/v1/province_tax/base/bulk",
+            json=[{"province": "Satun", "tax": 1.5}, {"province": "Yala", "tax": 2.5}],
+            headers=admin_headers,
+        )
+    ).json()
+    satun, yala = (p["id"] for p in provinces)
+
+    body = "\n".join(
+        [
+            json.dumps(
+                {"name": "A", "email": "a@example.com", "main_province_id": satun}
+            ),
+            json.dumps(
+                {
+                    "name": "B",
+                    "email": "b@example.com",
+                    "main_province_id": yala,
+                    "secondary_province_id": satun,
+                }
+            ),
+            json.dumps(
+                {"name": "C", "email": "c@example.com", "main_province_id": satun}
+            ),
+            json.dumps(
+                {"name": "D", "email": "not-an-email", "main_province_id": yala}
+            ),
+            "",
+            json.dumps({"name": "E", "email": "e@example.com", "main_province_id": -1}),
+        ]
+    )
+    resp = await client.post(
+        "/v1/province_tax/register/import?batch_size=2",
+        content=body.encode(),
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert resp.status_code == 200
+
+    *results, summary = [json.loads(line) for line in resp.text.splitlines()]
+    assert [(r["line"], r["status"]) for r in results] == [
+        (1, "created"),
+        (2, "created"),
+        (3, "duplicate"),
+        (4, "invalid"),
+        (6, "not_found"),
+    ]
+    assert summary["summary"]["created"] == 2
+    assert summary["summary"]["total"] == 5
+
+    registered = (
+        await client.get("/v1/province_tax/registered", headers=auth_headers)
+    ).json()
+    by_id = {r["id"]: r for r in registered}
+    assert by_id[results[1]["id"]]["secondary_province_tax"] == 1.5
+
+
+@pytest.mark.asyncio
+async def test_import_streams_results_during_upload(
+    client: AsyncClient, auth_headers, admin_headers
+):
+    [province] = (
+        await client.put(
+            "/v1/province_tax/base/bulk",
+            json=[{"province": "Pattani", "tax": 1.0}],
+            headers=admin_headers,
+        )
+    ).json()
+    line = json.dumps(
+        {"name": "F", "email": "f@example.com", "main_province_id": province["id"]}
+    )
+    # the second chunk is only sent once the first result came back
+    first_result = asyncio.Event()
+    uploads = [
+        {"type": "http.request", "body": line.encode() + b"\n", "more_body": True},
+        {"type": "http.request", "body": line.encode() + b"\n", "more_body": False},
+    ]
+    sent = []
+
+    async def receive():
+        if len(uploads) == 1:
+            await first_result.wait()
+        return uploads.pop(0)
+
+    async def send(message):
+        sent.append(message)
+        if message.get("body"):
+            first_result.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/v1/province_tax/register/import",
+        "raw_path": b"/v1/province_tax/register/import",
+        "query_string": b"batch_size=1",
+        "root_path": "",
+        "headers": [
+            (b"authorization", auth_headers["Authorization"].encode()),
+            (b"content-type", b"application/x-ndjson"),
+        ],
+        "client": ("127.0.0.1", 1234),
+        "server": ("localhost", 8000),
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout=5)
+
+    assert sent[0]["status"] == 200
+    results = [
+        json.loads(line)
+        for message in sent[1:]
+        for line in message.get("body", b"").splitlines()
+    ]
+    assert [r.get("status") for r in results[:2]] == ["created", "duplicate"]
+    assert results[2]["summary"]["total"] == 2
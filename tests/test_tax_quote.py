@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from httpx import AsyncClient
+
+from thaitravel.core import quote_engine
+from thaitravel.models import ProvinceEnum
+
+from .test_base import admin_headers, auth_headers, client
+
+
+def test_quote_engine_vectorized():
+    rates = quote_engine.rates_from({ProvinceEnum.KRABI: 2.0, ProvinceEnum.TRANG: 0.5})
+    quotes = quote_engine.quote(
+        rates,
+        main=quote_engine.ordinals([ProvinceEnum.KRABI, ProvinceEnum.TRANG]),
+        secondary=quote_engine.ordinals([ProvinceEnum.TRANG, None]),
+        travellers=np.array([2, 1]),
+        nights=np.array([3, 4]),
+    )
+    assert quotes.main_tax.tolist() == [12.0, 2.0]
+    assert quotes.secondary_tax.tolist() == [3.0, 0.0]
+    assert quotes.total.tolist() == [15.0, 2.0]
+    assert not quotes.missing.any()
+
+    unknown = quote_engine.quote(
+        rates,
+        main=quote_engine.ordinals([ProvinceEnum.YALA]),
+        secondary=quote_engine.ordinals([None]),
+        travellers=np.array([1]),
+        nights=np.array([1]),
+    )
+    assert unknown.missing.tolist() == [True]
+
+
+@pytest.mark.asyncio
+async def test_quote_endpoint(client: AsyncClient, auth_headers, admin_headers):
+    await client.put(
+        "/v1/province_tax/base/bulk",
+        json=[{"province": "Loei", "tax": 1.5}, {"province": "Surin", "tax": 2.0}],
+        headers=admin_headers,
+    )
+
+    resp = await client.post(
+        "/v1/province_tax/quote",
+        json={
+            "itineraries": [
+                {"main_province": "Loei", "travellers": 2, "nights": 2},
+                {
+                    "main_province": "Loei",
+                    "secondary_province": "Surin",
+                    "travellers": 1,
+                    "nights": 3,
+                },
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    assert resp.json()["quotes"] == [
+        {"main_province_tax": 6.0, "secondary_province_tax": None, "total": 6.0},
+        {"main_province_tax": 4.5, "secondary_province_tax": 6.0, "total": 10.5},
+    ]
+
+    missing = await client.post(
+        "/v1/province_tax/quote",
+        json={
+            "itineraries": [
+                {"main_province": "Narathiwat", "travellers": 1, "nights": 1}
+            ]
+        },
+    )
+    assert missing.status_code == 404
+    assert "Narathiwat" in missing.json()["detail"]
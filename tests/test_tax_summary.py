@@ -0,0 +1,51 @@
+import pytest
+from httpx import AsyncClient
+
+from thaitravel import models
+
+from .test_base import admin_headers, client, engine
+
+
+@pytest.mark.asyncio
+async def test_summary_tracks_registrations(client: AsyncClient, admin_headers):
+    ranong, tak = (
+        await client.put(
+            "/v1/province_tax/base/bulk",
+            json=[{"province": "Ranong", "tax": 2.0}, {"province": "Tak", "tax": 3.0}],
+            headers=admin_headers,
+        )
+    ).json()
+    await client.post(
+        "/v1/province_tax/register",
+        json={
+            "name": "Summary Company",
+            "email": "summary@company.com",
+            "main_province_id": ranong["id"],
+            "secondary_province_id": tak["id"],
+        },
+        headers=admin_headers,
+    )
+    await client.post(
+        "/v1/province_tax/register/import",
+        content=(
+            '{"name": "Imported", "email": "imported@company.com", '
+            f'"main_province_id": {tak["id"]}}}\n'
+        ),
+        headers=admin_headers,
+    )
+
+    resp = await client.get("/v1/province_tax/summary", headers=admin_headers)
+    assert resp.status_code == 200
+    summary = {row["province"]: row for row in resp.json()}
+    assert summary["Ranong"]["main_registration_count"] == 1
+    assert summary["Ranong"]["tax_total"] == 2.0
+    assert summary["Tak"]["main_registration_count"] == 1
+    assert summary["Tak"]["secondary_registration_count"] == 1
+    assert summary["Tak"]["registration_count"] == 2
+    assert summary["Tak"]["tax_total"] == 6.0
+
+    # the incremental totals match a full recomputation
+    async with engine.begin() as conn:
+        await models.province_tax_summary.rebuild(conn)
+    rebuilt = await client.get("/v1/province_tax/summary", headers=admin_headers)
+    assert rebuilt.json() == resp.json()
@@ -1,9 +1,12 @@
+import datetime
+
 import pytest
 import pytest_asyncio
 import httpx
 from httpx import AsyncClient
-from sqlmodel import SQLModel
+from sqlmodel import SQLModel, select
 
+from thaitravel import models
 from thaitravel.models import get_session
 from thaitravel.main import app
 
@@ -12,8 +15,18 @@ from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
-from .test_base import client, session, prepare_database, create_async_engine
+from .test_base import (
+    AsyncTestingSessionLocal,
+    client,
+    session,
+    prepare_database,
+    create_async_engine,
+)
 from thaitravel.core import config
+from thaitravel.core import deps, password_hashing, security
+from thaitravel.core.login_tracker import last_login_buffer
+from thaitravel.core.principal_cache import principal_cache
+from thaitravel.routers.v1 import authentication_router
 
 settings = config.get_settings()
 
@@ -71,3 +84,217 @@ async def test_user_token_and_auth_flow(client, user_data):
     me_response = await client.get("/v1/users/me", headers=headers)
 
     assert me_response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_list_users_admin_keyset_pages(client, auth_headers, admin_headers):
+    forbidden = await client.get("/v1/users", headers=auth_headers)
+    assert forbidden.status_code == 403
+
+    first = await client.get("/v1/users", params={"limit": 1}, headers=admin_headers)
+    assert first.status_code == 200
+    first_page = first.json()
+    assert len(first_page["users"]) == 1
+    assert first.headers["x-next-cursor"] == first_page["next_cursor"]
+
+    second = await client.get(
+        "/v1/users",
+        params={"limit": 1, "cursor": first_page["next_cursor"]},
+        headers=admin_headers,
+    )
+    assert second.status_code == 200
+    assert second.json()["users"][0]["id"] > first_page["users"][0]["id"]
+
+    everyone = await client.get(
+        "/v1/users", params={"limit": 200}, headers=admin_headers
+    )
+    assert everyone.json()["next_cursor"] is None
+
+    invalid = await client.get(
+        "/v1/users", params={"cursor": "x"}, headers=admin_headers
+    )
+    assert invalid.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_login_by_email_defers_last_login_date(client, session, user_data):
+    await client.post("/v1/users/create", json=user_data)
+    result = await session.exec(
+        select(models.DBUser).where(models.DBUser.username == user_data["username"])
+    )
+    user = result.one()
+    updated_date = user.updated_date
+
+    token_response = await client.post(
+        "/v1/token",
+        data={"username": user_data["email"], "password": user_data["password"]},
+    )
+    assert token_response.status_code == 200
+    assert token_response.json()["user_id"] == user.id
+    assert len(last_login_buffer) >= 1
+
+    # nothing is written until the buffer is flushed
+    await session.refresh(user)
+    assert (
+        user.last_login_date is None
+        or user.last_login_date
+        < datetime.datetime.fromisoformat(token_response.json()["issued_at"])
+    )
+
+    assert await last_login_buffer.flush(AsyncTestingSessionLocal) >= 1
+    assert len(last_login_buffer) == 0
+    await session.refresh(user)
+    assert user.last_login_date == datetime.datetime.fromisoformat(
+        token_response.json()["issued_at"]
+    )
+    assert user.updated_date == updated_date
+
+
+@pytest.mark.asyncio
+async def test_users_me_shows_flushed_last_login_date(client, user_data):
+    user_data = user_data | {"username": "lastlogin", "email": "lastlogin@email.local"}
+    await client.post("/v1/users/create", json=user_data)
+    tokens = (
+        await client.post(
+            "/v1/token",
+            data={"username": "lastlogin", "password": user_data["password"]},
+        )
+    ).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    # the first login is still buffered, so the cached user has none yet
+    before = await client.get("/v1/users/me", headers=headers)
+    assert principal_cache.get(tokens["user_id"]) is not None
+
+    await last_login_buffer.flush(AsyncTestingSessionLocal)
+    after = await client.get("/v1/users/me", headers=headers)
+    assert after.status_code == 200
+    assert datetime.datetime.fromisoformat(
+        after.json()["last_login_date"]
+    ) == datetime.datetime.fromisoformat(tokens["issued_at"])
+    assert after.headers["etag"] != before.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_invalidated_on_user_change(
+    client, session, auth_headers
+):
+    me = await client.get("/v1/users/me", headers=auth_headers)
+    assert me.status_code == 200
+    user_id = me.json()["id"]
+    assert principal_cache.get(user_id) is not None
+
+    user = await session.get(models.DBUser, user_id)
+    user.status = "inactive"
+    session.add(user)
+    await session.commit()
+    assert principal_cache.get(user_id) is None
+
+    inactive = await client.get("/v1/users", headers=auth_headers)
+    assert inactive.status_code == 400
+
+    user.status = "active"
+    session.add(user)
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_stateless_claims_skip_database(client, user_data, monkeypatch):
+    monkeypatch.setattr(deps.settings, "AUTH_STATELESS_CLAIMS", True)
+    monkeypatch.setattr(authentication_router.settings, "AUTH_STATELESS_CLAIMS", True)
+    user_data = user_data | {"username": "stateless", "email": "stateless@email.local"}
+    await client.post("/v1/users/create", json=user_data)
+    token_response = await client.post(
+        "/v1/token",
+        data={"username": user_data["username"], "password": user_data["password"]},
+    )
+    headers = {"Authorization": f"Bearer {token_response.json()['access_token']}"}
+    principal_cache.clear()
+
+    forbidden = await client.get("/v1/users", headers=headers)
+    assert forbidden.status_code == 403
+    # the role check was answered from the token alone
+    assert len(principal_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_refresh_token_issues_access_token_without_password(
+    client, user_data, monkeypatch
+):
+    user_data = user_data | {"username": "refresh", "email": "refresh@email.local"}
+    await client.post("/v1/users/create", json=user_data)
+    tokens = (
+        await client.post(
+            "/v1/token",
+            data={"username": "refresh", "password": user_data["password"]},
+        )
+    ).json()
+
+    refresh_claims = security.decode_token(tokens["refresh_token"])
+    assert refresh_claims["typ"] == "refresh"
+    lifetime = refresh_claims["exp"] - datetime.datetime.now().timestamp()
+    assert lifetime > (settings.REFRESH_TOKEN_EXPIRE_MINUTES - 1) * 60
+
+    # a refresh token is not a bearer token, an access token cannot refresh
+    refresh_as_bearer = await client.get(
+        "/v1/users/me", headers={"Authorization": f"Bearer {tokens['refresh_token']}"}
+    )
+    assert refresh_as_bearer.status_code == 401
+    access_as_refresh = await client.post(
+        "/v1/token/refresh", json={"refresh_token": tokens["access_token"]}
+    )
+    assert access_as_refresh.status_code == 401
+
+    async def no_bcrypt(*args):
+        raise AssertionError("refresh must not hash passwords")
+
+    monkeypatch.setattr(password_hashing.hasher, "verify", no_bcrypt)
+    refreshed = await client.post(
+        "/v1/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert refreshed.status_code == 200
+    assert refreshed.json()["user_id"] == tokens["user_id"]
+    assert refreshed.json()["refresh_token"] != tokens["refresh_token"]
+
+    me = await client.get(
+        "/v1/users/me",
+        headers={"Authorization": f"Bearer {refreshed.json()['access_token']}"},
+    )
+    assert me.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_reused_refresh_token_revokes_its_family(client, user_data):
+    user_data = user_data | {"username": "reuse", "email": "reuse@email.local"}
+    await client.post("/v1/users/create", json=user_data)
+    tokens = (
+        await client.post(
+            "/v1/token",
+            data={"username": "reuse", "password": user_data["password"]},
+        )
+    ).json()
+
+    first = await client.post(
+        "/v1/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert first.status_code == 200
+    rotated = first.json()["refresh_token"]
+    assert security.decode_token(rotated)["fam"] == (
+        security.decode_token(tokens["refresh_token"])["jti"]
+    )
+
+    # the second use is refused, even though the token is in the verified cache
+    again = await client.post(
+        "/v1/token/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert again.status_code == 401
+
+    # and whoever holds the rotated token is logged out as well
+    after_reuse = await client.post(
+        "/v1/token/refresh", json={"refresh_token": rotated}
+    )
+    assert after_reuse.status_code == 401
+
+
+def test_login_schema_has_no_account_columns():
+    assert set(models.Login.model_fields) == {"email", "password"}
@@ -1,12 +1,117 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
-    SQLDB_URL: str
+    SQLDB_URL: str = "sqlite+aiosqlite:///database.db"
+    SQLDB_ECHO: bool = False
+
+    # connection pool (ignored for in-memory SQLite, which needs a single connection)
+    SQLDB_POOL_SIZE: int = 5
+    SQLDB_MAX_OVERFLOW: int = 10
+    SQLDB_POOL_RECYCLE: int = 30 * 60  # 30 minutes
+    SQLDB_POOL_TIMEOUT: float = 30.0
+
+    # read-only pool used by GET endpoints (file based SQLite only)
+    SQLDB_READ_POOL_SIZE: int = 10
+    SQLDB_READ_MAX_OVERFLOW: int = 10
+
+    # PRAGMAs applied to every new SQLite connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # 256 MiB
+    SQLITE_CACHE_SIZE: int = -64 * 1024  # negative value is KiB, so 64 MiB
+    SQLITE_BUSY_TIMEOUT: int = 5000  # milliseconds
+
+    # refuse to start when a hot query would scan a whole table
+    SQLDB_STRICT_QUERY_PLANS: bool = False
+    # skip create_all() and migrations when the stored schema fingerprint matches
+    SQLDB_SKIP_UNCHANGED_SCHEMA: bool = True
+
+    # Server-Timing header and a log line per request, with SQL statement counts
+    REQUEST_TIMING_ENABLED: bool = True
+    REQUEST_QUERY_THRESHOLD: int = 10  # log a warning above this, 0 disables
+
+    # per-statement SQL stats; slower statements are logged, plans captured once
+    SLOW_QUERY_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    SLOW_QUERY_SAMPLE_RATE: float = 1.0  # fraction of statements timed
+    SLOW_QUERY_MAX_STATEMENTS: int = 1000  # distinct normalized statements kept
+    SLOW_QUERY_EXPLAIN: bool = True
+
+    # admins can profile one request by sending PROFILING_HEADER: 1
+    PROFILING_ENABLED: bool = True
+    PROFILING_HEADER: str = "x-profile"
+    PROFILING_INTERVAL: float = 0.001  # seconds between stack samples
+    PROFILING_MAX_PROFILES: int = 20  # kept in memory, oldest dropped first
+
+    # Prometheus text metrics on /metrics; with several worker processes point
+    # every worker at the same empty directory to get cluster-wide counters
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: str | None = None
+    METRICS_FLUSH_INTERVAL: float = 5.0  # seconds
+
+    # warm up before /health/ready reports ready
+    STARTUP_WARMUP: bool = True
+    STARTUP_PREOPEN_CONNECTIONS: int = 2  # per pool
+
+    # in-process copy of the province tax table
+    PROVINCE_TAX_CACHE_TTL: float = 60.0  # seconds, bounds staleness across workers
+    PROVINCE_TAX_CACHE_MISS_RELOAD_INTERVAL: float = 1.0  # seconds
+
+    # Cache-Control sent with ETag tagged responses, keyed by route
+    HTTP_CACHE_CONTROL: dict[str, str] = {
+        "province_tax_base": "public, max-age=60",
+        "users_me": "private, no-cache",
+        "users_get": "private, no-cache",
+    }
+
+    # keyset pagination of list endpoints
+    PAGINATION_DEFAULT_LIMIT: int = 50
+    PAGINATION_MAX_LIMIT: int = 200
+
+    # NDJSON registration import
+    IMPORT_BATCH_SIZE: int = 500
+    IMPORT_MAX_BATCH_SIZE: int = 5000
+    IMPORT_MAX_LINE_BYTES: int = 64 * 1024
+    IMPORT_RESULT_SPOOL_BYTES: int = 1024 * 1024  # larger results spill to disk
+
+    # rows fetched per round trip by streaming exports
+    EXPORT_CHUNK_ROWS: int = 1000
+
+    # bcrypt runs on its own pool, 0 workers hashes inline on the event loop
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_MAX_PENDING: int = 64  # beyond this requests get 503
+    PASSWORD_HASH_RETRY_AFTER: int = 1  # seconds
+
+    # last_login_date is written behind, coalesced per user
+    LAST_LOGIN_FLUSH_INTERVAL: float = 0.5  # seconds
+    LAST_LOGIN_FLUSH_MAX_ENTRIES: int = 500
+
+    # authenticated users cached by id, invalidated on commit in this process
+    PRINCIPAL_CACHE_TTL: float = 30.0  # seconds
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10_000
+    # put roles and status in access tokens so role checks skip the database;
+    # a role or status change then applies once the token expires
+    AUTH_STATELESS_CLAIMS: bool = False
+
+    # token buckets in front of /v1/token, checked before any query or hash
+    LOGIN_RATE_PER_IP: float = 5.0  # attempts per second
+    LOGIN_BURST_PER_IP: int = 50
+    LOGIN_RATE_PER_ACCOUNT: float = 0.2  # one attempt every 5 seconds
+    LOGIN_BURST_PER_ACCOUNT: int = 10
+    LOGIN_RATE_LIMIT_MAX_KEYS: int = 100_000
+
     SECRET_KEY: str = "secret"
+    # verified access token claims kept until the token expires
+    VERIFIED_TOKEN_CACHE_MAX_ENTRIES: int = 10_000
 
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 5 * 60  # 5 minutes
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 7 * 24 * 60  # 7 days
+    # /v1/token/refresh hands out a new refresh token along with the access token
+    REFRESH_TOKEN_ROTATION: bool = True
 
     model_config = {"env_file": ".env", "validate_assignment": True, "extra": "allow"}
 
@@ -1,8 +1,8 @@
 from fastapi import Depends, HTTPException, status, Path, Query
 from fastapi.security import OAuth2PasswordBearer
 
+import logging
 import typing
-from jose import JWTError, jwt
 from typing import Annotated
 
 from pydantic import ValidationError
@@ -10,17 +10,19 @@ from pydantic import ValidationError
 from thaitravel import models
 from . import security
 from . import config
+from . import request_timing
+from .principal_cache import principal_cache
 
+logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/v1/token")
 
 settings = config.get_settings()
 
 
-async def get_current_user(
+async def get_token_payload(
     token: Annotated[str, Depends(oauth2_scheme)],
-    session: Annotated[models.AsyncSession, Depends(models.get_session)],
-) -> models.User:
+) -> dict:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -28,42 +30,76 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[security.ALGORITHM],
-        )
+        with request_timing.phase("auth"):
+            payload = security.decode_token(token)
         user_id = payload.get("sub")
 
         if user_id is None:
             raise credentials_exception
+        # tokens issued before the ``typ`` claim existed are access tokens
+        token_type = payload.get("typ", security.ACCESS_TOKEN_TYPE)
+        if token_type != security.ACCESS_TOKEN_TYPE:
+            raise credentials_exception
 
         try:
-            user_id = int(user_id)
+            payload["sub"] = int(user_id)
         except (ValueError, TypeError):
             raise credentials_exception
 
-    except JWTError as e:
-        print(f"JWT Decode Error: {e}")
-        raise credentials_exception
-    user = await session.get(models.DBUser, user_id)
-    if user is None:
+    except security.InvalidTokenError as e:
+        logger.debug("JWT decode error: %s", e)
         raise credentials_exception
+    return payload
+
+
+async def get_current_user(
+    payload: Annotated[dict, Depends(get_token_payload)],
+    session: Annotated[models.AsyncSession, Depends(models.get_read_session)],
+) -> models.CurrentUser:
+    user_id = payload["sub"]
+    user = principal_cache.get(user_id)
+    if user is not None:
+        return user
+
+    version = principal_cache.version
+    with request_timing.phase("user"):
+        db_user = await session.get(models.DBUser, user_id)
+    if db_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
+    user = models.CurrentUser.model_validate(db_user)
+    principal_cache.put(user, version)
     return user
 
 
+async def get_current_principal(
+    payload: Annotated[dict, Depends(get_token_payload)],
+    session: Annotated[models.AsyncSession, Depends(models.get_read_session)],
+) -> models.Principal:
+    """Roles and status of the caller, from the token claims when they carry them."""
+    if settings.AUTH_STATELESS_CLAIMS and "roles" in payload and "status" in payload:
+        return models.Principal(
+            id=payload["sub"], roles=payload["roles"], status=payload["status"]
+        )
+    user = await get_current_user(payload, session)
+    return models.Principal(id=user.id, roles=user.roles, status=user.status)
+
+
 async def get_current_active_user(
-    current_user: typing.Annotated[models.User, Depends(get_current_user)],
-) -> models.User:
+    current_user: typing.Annotated[models.Principal, Depends(get_current_principal)],
+) -> models.Principal:
     if current_user.status != "active":
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
 async def get_current_active_superuser(
-    current_user: typing.Annotated[models.User, Depends(get_current_user)],
-) -> models.User:
+    current_user: typing.Annotated[models.Principal, Depends(get_current_principal)],
+) -> models.Principal:
     if "admin" not in current_user.roles:
         raise HTTPException(
             status_code=400, detail="The user doesn't have enough privileges"
@@ -77,7 +113,7 @@ class RoleChecker:
 
     def __call__(
         self,
-        user: typing.Annotated[models.User, Depends(get_current_active_user)],
+        user: typing.Annotated[models.Principal, Depends(get_current_active_user)],
     ):
         for role in user.roles:
             if role in self.allowed_roles:
@@ -0,0 +1,50 @@
+import hashlib
+
+from fastapi import Request, Response, status
+
+from . import config
+
+settings = config.get_settings()
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from the parts that identify a version of the content."""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether ``If-None-Match`` already names ``etag``."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cache_headers(route: str, etag: str) -> dict[str, str]:
+    headers = {"ETag": etag}
+    cache_control = settings.HTTP_CACHE_CONTROL.get(route)
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    return headers
+
+
+def conditional(
+    request: Request, response: Response, route: str, etag: str
+) -> Response | None:
+    """Return a 304 response if the client has ``etag``, otherwise tag ``response``.
+
+    ``route`` selects the ``Cache-Control`` value from
+    ``Settings.HTTP_CACHE_CONTROL``.
+    """
+    headers = cache_headers(route, etag)
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
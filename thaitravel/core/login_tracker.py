@@ -0,0 +1,107 @@
+import asyncio
+import datetime
+import logging
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from thaitravel import models
+from . import config
+from .principal_cache import principal_cache
+
+logger = logging.getLogger(__name__)
+
+settings = config.get_settings()
+
+table = models.DBUser.__table__
+
+
+class LastLoginBuffer:
+    """Write-behind buffer for ``users.last_login_date``.
+
+    Logins only record the time in memory; repeated logins of a user are
+    coalesced and written in one batched transaction every ``interval``
+    seconds, or sooner once ``max_entries`` users are waiting.
+    """
+
+    def __init__(self, interval: float, max_entries: int):
+        self.interval = interval
+        self.max_entries = max_entries
+        self._pending: dict[int, datetime.datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(self, user_id: int, when: datetime.datetime):
+        previous = self._pending.get(user_id)
+        if previous is None or when > previous:
+            self._pending[user_id] = when
+        if len(self._pending) >= self.max_entries:
+            self._wakeup.set()
+
+    async def flush(self, session_factory: async_sessionmaker) -> int:
+        """Write every pending login, returning the number of users updated."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        statement = (
+            update(table).where(table.c.id == bindparam("user_id"))
+            # a login is not a profile change, keep ``updated_date`` as is
+            .values(
+                last_login_date=bindparam("login_date"),
+                updated_date=table.c.updated_date,
+            )
+        )
+        rows = [
+            {"user_id": user_id, "login_date": when}
+            for user_id, when in pending.items()
+        ]
+        try:
+            async with session_factory() as session:
+                await session.exec(statement, params=rows)
+                await session.commit()
+        except Exception:
+            for user_id, when in pending.items():
+                self.record(user_id, when)
+            raise
+        # a core UPDATE does not reach the session hooks that invalidate
+        principal_cache.invalidate(*pending)
+        return len(rows)
+
+    async def _run(self, session_factory: async_sessionmaker):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush(session_factory)
+            except Exception:
+                logger.exception("Cannot write last login dates, retrying later")
+
+    def start(self, session_factory: async_sessionmaker):
+        if self._task is None:
+            # bound to the running loop, which differs between app lifespans
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(session_factory))
+
+    async def stop(self, session_factory: async_sessionmaker):
+        """Stop the background writer and flush what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush(session_factory)
+
+
+last_login_buffer = LastLoginBuffer(
+    interval=settings.LAST_LOGIN_FLUSH_INTERVAL,
+    max_entries=settings.LAST_LOGIN_FLUSH_MAX_ENTRIES,
+)
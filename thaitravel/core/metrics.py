@@ -0,0 +1,314 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms live in plain dicts keyed by label values, so
+recording one is a dict lookup and a few additions. Gauges are read from
+callbacks when ``/metrics`` is scraped.
+
+With ``METRICS_MULTIPROC_DIR`` set, every worker process writes a snapshot
+of its counters and histograms to ``<dir>/<pid>.json`` every
+``METRICS_FLUSH_INTERVAL`` seconds and on shutdown. A scrape of any worker
+then adds up those files and the scraped worker's live values. Gauges are
+only reported for the worker that answers the scrape, labelled with its pid.
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import math
+import os
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+settings = config.get_settings()
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def snapshot(self) -> dict:
+        # label values are joined into one JSON key; none of ours contain "|"
+        return {"|".join(labels): value for labels, value in self.values.items()}
+
+    @staticmethod
+    def merge(into: dict, other: dict):
+        for key, value in other.items():
+            into[key] = into.get(key, 0.0) + value
+
+    def samples(self, merged: dict) -> Iterable[tuple[str, dict, float]]:
+        for key, value in merged.items():
+            yield self.name + "_total", self._labels(key), value
+
+    def _labels(self, key: str) -> dict:
+        if not self.labelnames:
+            return {}
+        return dict(zip(self.labelnames, key.split("|")))
+
+
+class Histogram(Counter):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # per label values: a count per bucket plus +Inf, then sum and count
+        self.values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, *labels):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 3)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "|".join(labels): list(series) for labels, series in self.values.items()
+        }
+
+    @staticmethod
+    def merge(into: dict, other: dict):
+        for key, series in other.items():
+            if key in into:
+                into[key] = [a + b for a, b in zip(into[key], series)]
+            else:
+                into[key] = list(series)
+
+    def samples(self, merged: dict) -> Iterable[tuple[str, dict, float]]:
+        for key, series in merged.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                yield self.name + "_bucket", {**labels, "le": le}, cumulative
+            yield self.name + "_sum", labels, series[-2]
+            yield self.name + "_count", labels, series[-1]
+
+
+class Gauge:
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        callback: Callable[[], Iterable[tuple[tuple, float]]],
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.callback = callback
+
+    def samples(self) -> Iterable[tuple[str, dict, float]]:
+        for labels, value in self.callback():
+            yield self.name, dict(zip(self.labelnames, labels)), value
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(v)}"' for name, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self, multiproc_dir: str | None = None):
+        self.multiproc_dir = Path(multiproc_dir) if multiproc_dir else None
+        self.metrics: dict[str, Counter] = {}
+        self.gauges: dict[str, Gauge] = {}
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, tuple(labelnames)))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(
+            Histogram(name, documentation, tuple(labelnames), tuple(buckets))
+        )
+
+    def gauge(self, name: str, documentation: str, labelnames, callback) -> Gauge:
+        gauge = Gauge(name, documentation, tuple(labelnames), callback)
+        self.gauges[name] = gauge
+        return gauge
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def write_snapshot(self):
+        """Save this process' counters and histograms for the other workers."""
+        if self.multiproc_dir is None:
+            return
+        self.multiproc_dir.mkdir(parents=True, exist_ok=True)
+        path = self.multiproc_dir / f"{os.getpid()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+
+    def collect(self) -> dict:
+        """Counters and histograms of this process plus the other workers' files."""
+        merged = self.snapshot()
+        if self.multiproc_dir is None or not self.multiproc_dir.is_dir():
+            return merged
+
+        own = f"{os.getpid()}.json"
+        for path in self.multiproc_dir.glob("*.json"):
+            if path.name == own:
+                continue
+            try:
+                other = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # a file being replaced or a crashed worker's partial write
+                continue
+            for name, values in other.items():
+                metric = self.metrics.get(name)
+                if metric is not None:
+                    metric.merge(merged.setdefault(name, {}), values)
+        return merged
+
+    def render(self) -> str:
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for sample, labels, value in metric.samples(values):
+                lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+
+        pid = {"pid": str(os.getpid())} if self.multiproc_dir else {}
+        for name, gauge in self.gauges.items():
+            lines.append(f"# HELP {name} {gauge.documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for sample, labels, value in gauge.samples():
+                labels = {**labels, **pid}
+                lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    async def run_writer(self, interval: float):
+        """Write the snapshot file every ``interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.write_snapshot()
+            except OSError:
+                logger.exception("Cannot write metrics snapshot")
+
+
+registry = Registry(settings.METRICS_MULTIPROC_DIR)
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route"),
+)
+http_responses = registry.counter(
+    "http_responses",
+    "HTTP responses by route template and status code.",
+    ("method", "route", "status"),
+)
+db_pool_checkout = registry.histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the pool, waiting for one or opening it.",
+    ("pool",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+password_hash_duration = registry.histogram(
+    "password_hash_duration_seconds",
+    "Time bcrypt spent hashing or verifying one password, in the worker.",
+    ("operation",),
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+)
+password_hash_wait = registry.histogram(
+    "password_hash_queue_seconds",
+    "Time a password hash waited for a worker.",
+    ("operation",),
+)
+password_hash_rejected = registry.counter(
+    "password_hash_rejected",
+    "Password hashes refused because the hasher queue was full.",
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and status per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            # unmatched paths share one label, so scanners cannot blow up the series
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            http_request_duration.observe(time.perf_counter() - started, method, path)
+            http_responses.inc(method, path, str(status_code))
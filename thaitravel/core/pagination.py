@@ -0,0 +1,44 @@
+import base64
+import binascii
+import json
+from typing import Annotated
+
+from fastapi import HTTPException, Query, Request, Response, status
+
+from . import config
+
+settings = config.get_settings()
+
+Limit = Annotated[int, Query(ge=1, le=settings.PAGINATION_MAX_LIMIT)]
+
+
+def encode_cursor(*values) -> str:
+    """Opaque token for the sort key of the last row of a page."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """Inverse of ``encode_cursor``, checking each value against ``types``."""
+    invalid = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+    )
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise invalid
+
+    if not isinstance(values, list) or len(values) != len(types):
+        raise invalid
+    if not all(type(value) is type_ for value, type_ in zip(values, types)):
+        raise invalid
+    return tuple(values)
+
+
+def set_next_cursor(request: Request, response: Response, next_cursor: str | None):
+    """Advertise the next page through ``X-Next-Cursor`` and a ``Link`` header."""
+    if next_cursor is None:
+        return
+    next_url = request.url.include_query_params(cursor=next_cursor)
+    response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
@@ -0,0 +1,119 @@
+import asyncio
+import concurrent.futures
+import dataclasses
+import time
+
+import bcrypt
+
+from . import config
+from . import metrics
+
+settings = config.get_settings()
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes are already waiting for a worker."""
+
+
+def _hashpw(plain_password: bytes) -> tuple[bytes, float]:
+    started = time.perf_counter()
+    hashed = bcrypt.hashpw(plain_password, salt=bcrypt.gensalt())
+    return hashed, time.perf_counter() - started
+
+
+def _checkpw(plain_password: bytes, hashed_password: bytes) -> tuple[bool, float]:
+    started = time.perf_counter()
+    matched = bcrypt.checkpw(plain_password, hashed_password)
+    return matched, time.perf_counter() - started
+
+
+@dataclasses.dataclass
+class PasswordHasherStats:
+    pending: int = 0
+    completed: int = 0
+    rejected: int = 0
+    queue_seconds: float = 0.0
+    hash_seconds: float = 0.0
+    max_queue_seconds: float = 0.0
+    max_hash_seconds: float = 0.0
+
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop on a bounded worker pool.
+
+    At most ``max_pending`` hashes may be queued or running; beyond that
+    ``PasswordHasherBusy`` is raised at once instead of letting a login burst
+    pile up. ``workers=0`` hashes inline on the event loop.
+    """
+
+    def __init__(self, workers: int, max_pending: int, executor: str = "thread"):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor_kind = executor
+        self.stats = PasswordHasherStats()
+        self._executor: concurrent.futures.Executor | None = None
+
+    @property
+    def executor(self) -> concurrent.futures.Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+            else:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        if self.stats.pending >= self.max_pending:
+            self.stats.rejected += 1
+            metrics.password_hash_rejected.inc()
+            raise PasswordHasherBusy()
+
+        self.stats.pending += 1
+        started = time.perf_counter()
+        try:
+            if self.workers <= 0:
+                result, hash_seconds = func(*args)
+            else:
+                loop = asyncio.get_running_loop()
+                result, hash_seconds = await loop.run_in_executor(
+                    self.executor, func, *args
+                )
+        finally:
+            self.stats.pending -= 1
+
+        queue_seconds = max(0.0, time.perf_counter() - started - hash_seconds)
+        stats = self.stats
+        stats.completed += 1
+        stats.queue_seconds += queue_seconds
+        stats.hash_seconds += hash_seconds
+        stats.max_queue_seconds = max(stats.max_queue_seconds, queue_seconds)
+        stats.max_hash_seconds = max(stats.max_hash_seconds, hash_seconds)
+        metrics.password_hash_duration.observe(hash_seconds, operation)
+        metrics.password_hash_wait.observe(queue_seconds, operation)
+        return result
+
+    async def hash(self, plain_password: str) -> str:
+        hashed = await self._run("hash", _hashpw, plain_password.encode("utf-8"))
+        return hashed.decode("utf-8")
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(
+            "verify",
+            _checkpw,
+            plain_password.encode("utf-8"),
+            hashed_password.encode("utf-8"),
+        )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+)
@@ -0,0 +1,86 @@
+import collections
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from thaitravel import models
+from . import config
+
+settings = config.get_settings()
+
+_CHANGED_KEY = "users_changed"
+
+
+class PrincipalCache:
+    """Bounded LRU of authenticated users by id, each entry valid for ``ttl``.
+
+    Commits in this process that change or delete a user drop its entry
+    immediately; ``ttl`` bounds how long a change committed by another worker
+    process, or by a core statement, can go unseen.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: collections.OrderedDict[
+            int, tuple[float, models.CurrentUser]
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int) -> models.CurrentUser | None:
+        entry = self._entries.get(user_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, user: models.CurrentUser, version: int):
+        """Cache ``user`` unless an invalidation happened since ``version``."""
+        if version != self.version or self.max_entries <= 0:
+            return
+        self._entries[user.id] = (time.monotonic(), user)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids: int):
+        self.version += 1
+        for user_id in user_ids:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        self.version += 1
+        self._entries.clear()
+
+
+principal_cache = PrincipalCache(
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_user_changes(session, flush_context):
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, models.DBUser) and obj.id is not None:
+            session.info.setdefault(_CHANGED_KEY, set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals(session):
+    user_ids = session.info.pop(_CHANGED_KEY, None)
+    if user_ids:
+        principal_cache.invalidate(*user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_user_changes(session):
+    session.info.pop(_CHANGED_KEY, None)
@@ -0,0 +1,212 @@
+"""On-demand sampling profiles of single requests.
+
+An admin sends ``PROFILING_HEADER: 1`` with any request. ``ProfilingMiddleware``
+checks the bearer token with the usual dependencies and, for an admin, runs a
+thread that samples the event loop thread's Python stack every
+``PROFILING_INTERVAL`` seconds until the response is sent. The samples are
+kept as collapsed stacks (``frame;frame;frame count``), the input format of
+flamegraph.pl and speedscope, in a ring buffer of the last
+``PROFILING_MAX_PROFILES`` profiles.
+
+The event loop runs other requests too, so their frames show up in the
+samples of a profile taken under load. Only one profile runs at a time.
+Without the header, the middleware only scans the request headers.
+"""
+
+import collections
+import dataclasses
+import datetime
+import itertools
+import logging
+import sys
+import threading
+import time
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+
+from thaitravel import models
+from . import config
+from . import deps
+
+logger = logging.getLogger(__name__)
+
+settings = config.get_settings()
+
+
+@dataclasses.dataclass
+class Profile:
+    id: int
+    method: str
+    path: str
+    started_at: datetime.datetime
+    interval: float
+    route: str | None = None
+    status_code: int | None = None
+    duration_seconds: float = 0.0
+    stacks: collections.Counter = dataclasses.field(
+        default_factory=collections.Counter, repr=False
+    )
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_qualname}:{frame.f_lineno}"
+
+
+class StackSampler:
+    """Samples the stack of ``thread_id`` from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float, stacks: collections.Counter):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = stacks
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+
+class ProfileStore:
+    def __init__(self, max_profiles: int):
+        self.profiles: collections.deque[Profile] = collections.deque(
+            maxlen=max_profiles
+        )
+        self._ids = itertools.count(1)
+        self.active = False
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, profile: Profile):
+        self.profiles.append(profile)
+
+    def get(self, profile_id: int) -> Profile | None:
+        for profile in self.profiles:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    def clear(self):
+        self.profiles.clear()
+
+
+store = ProfileStore(settings.PROFILING_MAX_PROFILES)
+
+
+async def is_admin(scope) -> bool:
+    """Whether the request's bearer token belongs to an active admin."""
+    scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+
+    # honour overrides, so tests see the same database as the routes
+    overrides = scope["app"].dependency_overrides
+    session_factory = overrides.get(
+        models.get_read_session_factory, models.get_read_session_factory
+    )()
+    try:
+        payload = await deps.get_token_payload(token)
+        async with session_factory() as session:
+            principal = await deps.get_current_principal(payload, session)
+        deps.RoleChecker("admin")(await deps.get_current_active_user(principal))
+    except HTTPException:
+        return False
+    return True
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware profiling requests that carry the profiling header."""
+
+    def __init__(self, app, header: str | None = None, interval: float | None = None):
+        self.app = app
+        self.header = (header or settings.PROFILING_HEADER).lower().encode("latin-1")
+        self.interval = settings.PROFILING_INTERVAL if interval is None else interval
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if store.active:
+            await self.app(scope, receive, send)
+            return
+
+        # claim the slot before awaiting, so concurrent requests cannot both pass
+        store.active = True
+        try:
+            allowed = await is_admin(scope)
+            if allowed:
+                await self._profile(scope, receive, send)
+        finally:
+            store.active = False
+        if not allowed:
+            await self.app(scope, receive, send)
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == self.header:
+                return value not in (b"", b"0")
+        return False
+
+    async def _profile(self, scope, receive, send):
+        profile = Profile(
+            id=store.next_id(),
+            method=scope["method"],
+            path=scope["path"],
+            started_at=datetime.datetime.now(datetime.timezone.utc),
+            interval=self.interval,
+        )
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", str(profile.id).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = StackSampler(threading.get_ident(), self.interval, profile.stacks)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop()
+            profile.duration_seconds = time.perf_counter() - started
+            route = scope.get("route")
+            profile.route = route.path if route is not None else None
+            store.add(profile)
+            logger.info(
+                "Profiled %s %s as %d: %d samples in %.1fms",
+                profile.method,
+                profile.path,
+                profile.id,
+                profile.samples,
+                profile.duration_seconds * 1000,
+            )
@@ -0,0 +1,131 @@
+import asyncio
+import dataclasses
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from thaitravel import models, schemas
+from . import config
+from . import http_cache
+
+settings = config.get_settings()
+
+_CHANGED_KEY = "province_tax_changed"
+
+
+@dataclasses.dataclass(frozen=True)
+class ProvinceTaxSnapshot:
+    version: int
+    items: tuple[schemas.ProvinceTax, ...]
+    by_id: dict[int, schemas.ProvinceTax]
+    by_province: dict[models.ProvinceEnum, schemas.ProvinceTax]
+    etag: str
+    loaded_at: float
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at
+
+
+class ProvinceTaxTable:
+    """In-memory copy of the ``provice_tax`` table.
+
+    The table has at most one row per ``ProvinceEnum`` value, so the whole
+    thing is loaded at once and replaced on change. Commits in this process
+    invalidate it immediately; ``ttl`` bounds how long a change committed by
+    another worker process can go unseen.
+    """
+
+    def __init__(self, ttl: float, miss_reload_interval: float):
+        self.ttl = ttl
+        self.miss_reload_interval = miss_reload_interval
+        self.version = 0
+        self._snapshot: ProvinceTaxSnapshot | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def snapshot(self) -> ProvinceTaxSnapshot | None:
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.age > self.ttl:
+            return None
+        return snapshot
+
+    def invalidate(self):
+        self.version += 1
+        self._snapshot = None
+
+    async def load(self, session: AsyncSession) -> ProvinceTaxSnapshot:
+        version = self.version
+        result = await session.exec(
+            select(models.DBBaseProvinceTax).order_by(models.DBBaseProvinceTax.id)
+        )
+        items = tuple(schemas.ProvinceTax.model_validate(row) for row in result.all())
+        snapshot = ProvinceTaxSnapshot(
+            version=version,
+            items=items,
+            by_id={item.id: item for item in items},
+            by_province={item.province: item for item in items},
+            etag=http_cache.make_etag(
+                *(f"{item.id}:{item.province.value}:{item.tax!r}" for item in items)
+            ),
+            loaded_at=time.monotonic(),
+        )
+        # a commit that landed while we were reading makes this copy stale
+        if version == self.version:
+            self._snapshot = snapshot
+        return snapshot
+
+    async def get(self, session: AsyncSession) -> ProvinceTaxSnapshot:
+        snapshot = self.snapshot
+        if snapshot is not None:
+            return snapshot
+
+        async with self._lock:
+            snapshot = self.snapshot
+            if snapshot is None:
+                snapshot = await self.load(session)
+        return snapshot
+
+    async def lookup(
+        self, session: AsyncSession, province_ids: list[int]
+    ) -> dict[int, schemas.ProvinceTax]:
+        """Find province taxes by id, reloading once if any id is unknown."""
+        snapshot = await self.get(session)
+        if (
+            any(province_id not in snapshot.by_id for province_id in province_ids)
+            and snapshot.age > self.miss_reload_interval
+        ):
+            snapshot = await self.load(session)
+        return {
+            province_id: snapshot.by_id[province_id]
+            for province_id in province_ids
+            if province_id in snapshot.by_id
+        }
+
+
+province_tax_table = ProvinceTaxTable(
+    ttl=settings.PROVINCE_TAX_CACHE_TTL,
+    miss_reload_interval=settings.PROVINCE_TAX_CACHE_MISS_RELOAD_INTERVAL,
+)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_province_tax_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, models.DBBaseProvinceTax):
+            session.info[_CHANGED_KEY] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_province_tax_table(session):
+    if session.info.pop(_CHANGED_KEY, False):
+        province_tax_table.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_province_tax_changes(session):
+    session.info.pop(_CHANGED_KEY, None)
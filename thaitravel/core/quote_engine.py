@@ -0,0 +1,87 @@
+"""Vectorized tax quotes for itineraries over ``ProvinceEnum``.
+
+Rates live in a dense array indexed by the ordinal of the province in
+``ProvinceEnum``; a province without a rate holds NaN. A rate is charged per
+traveller per night, so for a batch of itineraries::
+
+    main_tax = rates[main] * travellers * nights
+    secondary_tax = rates[secondary] * travellers * nights
+
+computed for the whole batch at once. Nothing here touches the database, so
+offline pricing jobs can call ``quote`` directly with their own rates.
+"""
+
+import dataclasses
+from typing import Iterable, Mapping
+
+import numpy as np
+
+from thaitravel.models import ProvinceEnum
+
+PROVINCES: tuple[ProvinceEnum, ...] = tuple(ProvinceEnum)
+ORDINALS: dict[ProvinceEnum, int] = {
+    province: ordinal for ordinal, province in enumerate(PROVINCES)
+}
+
+# secondary province ordinal for "no secondary province"
+NO_PROVINCE = -1
+
+
+@dataclasses.dataclass(frozen=True)
+class Quotes:
+    main_tax: np.ndarray
+    secondary_tax: np.ndarray
+    total: np.ndarray
+    # itineraries that name a province without a rate
+    missing: np.ndarray
+
+
+def rates_from(taxes: Mapping[ProvinceEnum, float]) -> np.ndarray:
+    rates = np.full(len(PROVINCES), np.nan)
+    for province, tax in taxes.items():
+        rates[ORDINALS[province]] = tax
+    return rates
+
+
+def ordinals(provinces: Iterable[ProvinceEnum | None]) -> np.ndarray:
+    return np.fromiter(
+        (NO_PROVINCE if p is None else ORDINALS[p] for p in provinces), dtype=np.intp
+    )
+
+
+def quote(
+    rates: np.ndarray,
+    main: np.ndarray,
+    secondary: np.ndarray,
+    travellers: np.ndarray,
+    nights: np.ndarray,
+) -> Quotes:
+    """Quote every itinerary given as parallel arrays of ordinals and counts."""
+    # one extra zero rate at the end, so NO_PROVINCE (-1) indexes a free province
+    padded = np.append(rates, 0.0)
+    main_rate = padded[main]
+    secondary_rate = padded[secondary]
+
+    units = np.multiply(travellers, nights, dtype=np.float64)
+    main_tax = main_rate * units
+    secondary_tax = secondary_rate * units
+    return Quotes(
+        main_tax=main_tax,
+        secondary_tax=secondary_tax,
+        total=main_tax + secondary_tax,
+        missing=np.isnan(main_rate) | np.isnan(secondary_rate),
+    )
+
+
+_rates_cache: tuple[str, np.ndarray] | None = None
+
+
+def rates_for_snapshot(snapshot) -> np.ndarray:
+    """Rates of a ``ProvinceTaxSnapshot``, built once per snapshot content."""
+    global _rates_cache
+    cached = _rates_cache
+    if cached is None or cached[0] != snapshot.etag:
+        rates = rates_from({item.province: item.tax for item in snapshot.items})
+        rates.setflags(write=False)
+        cached = _rates_cache = (snapshot.etag, rates)
+    return cached[1]
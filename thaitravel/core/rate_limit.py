@@ -0,0 +1,69 @@
+import collections
+import math
+import time
+
+from fastapi import HTTPException, status
+
+from . import config
+
+settings = config.get_settings()
+
+
+class TokenBucketLimiter:
+    """Token buckets of ``burst`` tokens refilled at ``rate`` per second, per key.
+
+    Only the ``max_keys`` most recently used keys are tracked; a key that
+    was dropped starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._buckets: collections.OrderedDict[str, tuple[float, float]] = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: str, now: float | None = None) -> float:
+        """Take a token for ``key``; return 0, or the seconds until one is free."""
+        if now is None:
+            now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self.rejected += 1
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate if self.rate > 0 else math.inf
+
+        self._buckets[key] = (tokens - 1, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return 0.0
+
+    def clear(self):
+        self._buckets.clear()
+
+
+def too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many login attempts, try again later.",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+login_ip_limiter = TokenBucketLimiter(
+    rate=settings.LOGIN_RATE_PER_IP,
+    burst=settings.LOGIN_BURST_PER_IP,
+    max_keys=settings.LOGIN_RATE_LIMIT_MAX_KEYS,
+)
+login_account_limiter = TokenBucketLimiter(
+    rate=settings.LOGIN_RATE_PER_ACCOUNT,
+    burst=settings.LOGIN_BURST_PER_ACCOUNT,
+    max_keys=settings.LOGIN_RATE_LIMIT_MAX_KEYS,
+)
@@ -0,0 +1,84 @@
+import csv
+import datetime
+import io
+import json
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import Row, Select, or_, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from thaitravel import models, schemas
+
+table = models.DBRegisteredProvinceTax.__table__
+
+COLUMNS = [column.name for column in table.c]
+
+
+def export_statement(
+    province_id: int | None = None,
+    date_from: datetime.datetime | None = None,
+    date_to: datetime.datetime | None = None,
+) -> Select:
+    """Registrations in ``id`` order, optionally for one province and a date range.
+
+    ``province_id`` matches the main or the secondary province, ``date_to``
+    is exclusive.
+    """
+    statement = select(*table.c).order_by(table.c.id)
+    if province_id is not None:
+        statement = statement.where(
+            or_(
+                table.c.main_province_id == province_id,
+                table.c.secondary_province_id == province_id,
+            )
+        )
+    if date_from is not None:
+        statement = statement.where(table.c.register_date >= date_from)
+    if date_to is not None:
+        statement = statement.where(table.c.register_date < date_to)
+    return statement
+
+
+def _value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(rows: Sequence[Row], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(COLUMNS)
+    writer.writerows([_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+def encode_ndjson(rows: Sequence[Row]) -> bytes:
+    return "".join(
+        json.dumps({key: _value(value) for key, value in row._mapping.items()}) + "\n"
+        for row in rows
+    ).encode()
+
+
+async def stream_registrations(
+    session_factory: async_sessionmaker,
+    statement: Select,
+    export_format: schemas.ExportFormat,
+    chunk_rows: int,
+) -> AsyncIterator[bytes]:
+    """Encode the rows of ``statement`` as they are fetched, ``chunk_rows`` at a time.
+
+    The session is owned by the generator because the response body is sent
+    after the request's dependencies have been closed.
+    """
+    if export_format == schemas.ExportFormat.CSV:
+        yield encode_csv([], header=True)
+
+    async with session_factory() as session:
+        result = await session.stream(statement)
+        async for rows in result.partitions(chunk_rows):
+            if export_format == schemas.ExportFormat.CSV:
+                yield encode_csv(rows)
+            else:
+                yield encode_ndjson(rows)
@@ -0,0 +1,289 @@
+import asyncio
+import tempfile
+from typing import AsyncIterable, AsyncIterator
+
+import pydantic
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from thaitravel import models, schemas
+from .province_tax_cache import province_tax_table
+
+
+async def iter_lines(
+    chunks: AsyncIterable[bytes], max_line_bytes: int
+) -> AsyncIterator[bytes | None]:
+    """Split a byte stream into lines, yielding ``None`` for oversized lines.
+
+    At most ``max_line_bytes`` of a line are held in memory at a time.
+    """
+    buffer = bytearray()
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                if not oversized:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        oversized = True
+                        buffer.clear()
+                break
+
+            if not oversized:
+                buffer += chunk[start:end]
+            if oversized or len(buffer) > max_line_bytes:
+                yield None
+            else:
+                yield bytes(buffer)
+            buffer.clear()
+            oversized = False
+            start = end + 1
+
+    if oversized:
+        yield None
+    elif buffer:
+        yield bytes(buffer)
+
+
+class ResultSpool:
+    """Result lines written by the import and read back by the response body.
+
+    Unsent lines past ``max_size`` bytes spill to a temporary file, so the
+    import keeps reading the upload while the client is not reading the
+    response, as many clients only do once they finished sending.
+    """
+
+    def __init__(self, max_size: int):
+        self.file = tempfile.SpooledTemporaryFile(max_size=max_size)
+        self.written = 0
+        self.sent = 0
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    def write(self, data: bytes):
+        self.file.seek(self.written)
+        self.file.write(data)
+        self.written += len(data)
+        self._changed.set()
+
+    def close(self):
+        self.closed = True
+        self._changed.set()
+
+    async def chunks(self, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        """Everything written so far, then each write as it comes, until closed."""
+        while True:
+            if self.sent < self.written:
+                self.file.seek(self.sent)
+                chunk = self.file.read(min(chunk_size, self.written - self.sent))
+                self.sent += len(chunk)
+                yield chunk
+            elif self.closed:
+                return
+            else:
+                self._changed.clear()
+                await self._changed.wait()
+
+
+async def stream_import(
+    session_factory: async_sessionmaker,
+    user_id: int,
+    batch_size: int,
+    lines: AsyncIterable[bytes | None],
+    spool_bytes: int,
+) -> AsyncIterator[bytes]:
+    """Import ``lines`` in a task and yield result lines as batches commit.
+
+    The session is owned by the task because the response body is sent
+    after the request's dependencies have been closed.
+    """
+    spool = ResultSpool(spool_bytes)
+
+    async def run():
+        try:
+            async with session_factory() as session:
+                importer = RegistrationImporter(session, user_id, batch_size)
+                async for result in importer.run(lines):
+                    spool.write(
+                        result.model_dump_json(exclude_none=True).encode() + b"\n"
+                    )
+                spool.write(
+                    b'{"summary":'
+                    + importer.summary().model_dump_json().encode()
+                    + b"}\n"
+                )
+        finally:
+            spool.close()
+
+    task = asyncio.create_task(run())
+    try:
+        async for chunk in spool.chunks():
+            yield chunk
+        await task
+    finally:
+        task.cancel()
+        spool.file.close()
+
+
+class UploadStreamingResponse(StreamingResponse):
+    """``StreamingResponse`` whose body reads the request body as it goes.
+
+    Starlette watches for a disconnect by calling ``receive`` while the body
+    streams, which would take the upload's chunks from the body.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class RegistrationImporter:
+    """Insert NDJSON ``RegisterProvinceTaxRequest`` lines for one user.
+
+    Province taxes come from one snapshot of the cached table and existing
+    registrations of the user are read once, so each batch of ``batch_size``
+    lines costs a single INSERT and a commit. Results are yielded in line
+    order once the batch holding the line is committed, while later lines
+    are still being read.
+    """
+
+    def __init__(self, session: AsyncSession, user_id: int, batch_size: int):
+        self.session = session
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.counts = {status: 0 for status in schemas.ImportStatus}
+
+        self._registered: set[int] = set()
+        self._results: list[schemas.RegistrationImportResult] = []
+        self._rows: list[tuple[schemas.RegistrationImportResult, dict]] = []
+
+    async def run(
+        self, lines: AsyncIterable[bytes | None]
+    ) -> AsyncIterator[schemas.RegistrationImportResult]:
+        snapshot = await province_tax_table.get(self.session)
+        registered = await self.session.exec(
+            select(models.DBRegisteredProvinceTax.main_province_id).where(
+                models.DBRegisteredProvinceTax.user_id == self.user_id
+            )
+        )
+        self._registered = set(registered.all())
+        # the import commits in batches, release the read snapshot first
+        await self.session.commit()
+
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if line is not None and not line.strip():
+                continue
+
+            self._add(line_number, line, snapshot.by_id)
+            if len(self._results) >= self.batch_size:
+                for result in await self._flush():
+                    yield result
+
+        for result in await self._flush():
+            yield result
+
+    def _add(self, line_number: int, line: bytes | None, province_taxes: dict):
+        result = schemas.RegistrationImportResult(
+            line=line_number, status=schemas.ImportStatus.CREATED
+        )
+        self._results.append(result)
+
+        if line is None:
+            result.status = schemas.ImportStatus.INVALID
+            result.detail = "Line is too long."
+            return
+        try:
+            data = schemas.RegisterProvinceTaxRequest.model_validate_json(line)
+        except pydantic.ValidationError as e:
+            result.status = schemas.ImportStatus.INVALID
+            result.detail = "; ".join(
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                for error in e.errors()
+            )
+            return
+
+        if data.main_province_id in self._registered:
+            result.status = schemas.ImportStatus.DUPLICATE
+            result.detail = "Already registered for this province."
+            return
+
+        main_tax = province_taxes.get(data.main_province_id)
+        if not main_tax:
+            result.status = schemas.ImportStatus.NOT_FOUND
+            result.detail = "Main province not found."
+            return
+
+        secondary_tax = None
+        if data.secondary_province_id:
+            secondary = province_taxes.get(data.secondary_province_id)
+            if not secondary:
+                result.status = schemas.ImportStatus.NOT_FOUND
+                result.detail = "Secondary province not found."
+                return
+            secondary_tax = secondary.tax
+
+        self._registered.add(data.main_province_id)
+        self._rows.append(
+            (
+                result,
+                dict(
+                    user_id=self.user_id,
+                    name=data.name,
+                    email=data.email,
+                    main_province_id=data.main_province_id,
+                    main_province_tax=main_tax.tax,
+                    secondary_province_id=data.secondary_province_id,
+                    secondary_province_tax=secondary_tax,
+                ),
+            )
+        )
+
+    async def _insert(self, rows: list[tuple[schemas.RegistrationImportResult, dict]]):
+        table = models.DBRegisteredProvinceTax.__table__
+        result = await self.session.exec(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            params=[values for _, values in rows],
+        )
+        for (import_result, _), row in zip(rows, result.all()):
+            import_result.id = row.id
+        await models.province_tax_summary.apply(
+            self.session, [values for _, values in rows]
+        )
+        await self.session.commit()
+
+    async def _flush(self) -> list[schemas.RegistrationImportResult]:
+        rows, self._rows = self._rows, []
+        results, self._results = self._results, []
+        if rows:
+            try:
+                await self._insert(rows)
+            except IntegrityError:
+                # a concurrent request registered one of these provinces,
+                # find out which row it was one at a time
+                await self.session.rollback()
+                for row in rows:
+                    try:
+                        await self._insert([row])
+                    except IntegrityError:
+                        await self.session.rollback()
+                        row[0].status = schemas.ImportStatus.DUPLICATE
+                        row[0].detail = "Already registered for this province."
+
+        for result in results:
+            self.counts[result.status] += 1
+        return results
+
+    def summary(self) -> schemas.RegistrationImportSummary:
+        return schemas.RegistrationImportSummary(
+            total=sum(self.counts.values()),
+            **{status.value: count for status, count in self.counts.items()},
+        )
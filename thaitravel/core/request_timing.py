@@ -0,0 +1,195 @@
+"""Per-request timing breakdown: SQL statements, rows read and written, phases.
+
+``RequestTimingMiddleware`` starts a ``RequestTiming`` for every HTTP request
+and keeps it in a context variable, where the SQLAlchemy events below and
+``phase()`` blocks in the request path add to it. The totals go out as a
+``Server-Timing`` header and as one structured log line per request.
+"""
+
+import contextlib
+import contextvars
+import dataclasses
+import json
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+settings = config.get_settings()
+
+
+@dataclasses.dataclass
+class RequestTiming:
+    scope: dict = dataclasses.field(default_factory=dict, repr=False)
+    started: float = dataclasses.field(default_factory=time.perf_counter)
+    queries: int = 0
+    rows_fetched: int = 0
+    rows_written: int = 0
+    db_seconds: float = 0.0
+    phases: dict[str, float] = dataclasses.field(default_factory=dict)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def add_phase(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        metrics = [
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries, '
+            f'{self.rows_fetched} rows fetched, {self.rows_written} rows written"'
+        ]
+        metrics.extend(
+            f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items()
+        )
+        metrics.append(f"total;dur={self.elapsed * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+current_timing: contextvars.ContextVar[RequestTiming | None] = contextvars.ContextVar(
+    "current_timing", default=None
+)
+
+
+def current_route() -> str | None:
+    """Route template of the current request, or its path before routing."""
+    timing = current_timing.get()
+    if timing is None:
+        return None
+    route = timing.scope.get("route")
+    return route.path if route is not None else timing.scope.get("path")
+
+
+@contextlib.contextmanager
+def phase(name: str):
+    """Time the enclosed block as ``name`` of the current request, if any."""
+    timing = current_timing.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add_phase(name, time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    if current_timing.get() is not None:
+        conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    timing = current_timing.get()
+    if timing is None:
+        return
+    started = conn.info.pop("query_started", None)
+    if started is None:
+        # the statement began before the request's timing did
+        return
+    timing.db_seconds += time.perf_counter() - started
+    timing.queries += 1
+    # DBAPI rowcount is -1 for SELECT, so only writes are counted
+    if cursor.rowcount > 0:
+        timing.rows_written += cursor.rowcount
+
+
+class _CountingFetchStrategy:
+    """Fetch strategy of a result that counts the rows it hands out."""
+
+    def __init__(self, strategy, timing: RequestTiming):
+        self._strategy = strategy
+        self._timing = timing
+
+    def __getattr__(self, name):
+        return getattr(self._strategy, name)
+
+    def fetchone(self, result, dbapi_cursor, hard_close=False):
+        row = self._strategy.fetchone(result, dbapi_cursor, hard_close)
+        if row is not None:
+            self._timing.rows_fetched += 1
+        return row
+
+    def fetchmany(self, result, dbapi_cursor, size=None):
+        rows = self._strategy.fetchmany(result, dbapi_cursor, size)
+        self._timing.rows_fetched += len(rows)
+        return rows
+
+    def fetchall(self, result, dbapi_cursor):
+        rows = self._strategy.fetchall(result, dbapi_cursor)
+        self._timing.rows_fetched += len(rows)
+        return rows
+
+
+@event.listens_for(Engine, "after_execute")
+def _count_fetched_rows(conn, clauseelement, multiparams, params, options, result):
+    timing = current_timing.get()
+    if timing is None or not result.returns_rows:
+        return
+    # rows are counted as they are fetched, a result read halfway counts half
+    result.cursor_strategy = _CountingFetchStrategy(result.cursor_strategy, timing)
+
+
+class RequestTimingMiddleware:
+    """Pure ASGI middleware, so the context variable reaches the endpoint."""
+
+    def __init__(self, app, query_threshold: int | None = None):
+        self.app = app
+        self.query_threshold = (
+            settings.REQUEST_QUERY_THRESHOLD
+            if query_threshold is None
+            else query_threshold
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming(scope)
+        token = current_timing.set(timing)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timing.reset(token)
+            self.log(scope, status_code, timing)
+
+    def log(self, scope, status_code: int, timing: RequestTiming):
+        record = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "duration_ms": round(timing.elapsed * 1000, 2),
+            "db_ms": round(timing.db_seconds * 1000, 2),
+            "queries": timing.queries,
+            "rows_fetched": timing.rows_fetched,
+            "rows_written": timing.rows_written,
+            "phases_ms": {
+                name: round(seconds * 1000, 2)
+                for name, seconds in timing.phases.items()
+            },
+        }
+        if self.query_threshold and timing.queries > self.query_threshold:
+            record["too_many_queries"] = True
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
@@ -1,13 +1,22 @@
+import collections
 import datetime
+import hashlib
+import secrets
+import time
 from typing import Any, Union
 
 import jwt
+from jwt import InvalidTokenError
 
 from . import config
 
 
 ALGORITHM = "HS256"
 
+# ``typ`` claim, so a refresh token cannot be used as an access token
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
 settings = config.get_settings()
 
 
@@ -19,7 +28,9 @@ def create_access_token(data: dict, expires_delta: datetime.timedelta | None = N
         expire = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode.update({"exp": expire, "sub": str(data.get("sub", 0))})
+    to_encode.update(
+        {"exp": expire, "sub": str(data.get("sub", 0)), "typ": ACCESS_TOKEN_TYPE}
+    )
 
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
@@ -35,6 +46,67 @@ def create_refresh_token(
         expire = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(
             minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES
         )
-    to_encode.update({"exp": expire})
+    to_encode.update(
+        {
+            "exp": expire,
+            "sub": str(data.get("sub", 0)),
+            "typ": REFRESH_TOKEN_TYPE,
+            # tells apart refresh tokens rotated within the same second
+            "jti": secrets.token_urlsafe(12),
+        }
+    )
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+class VerifiedTokenCache:
+    """LRU of verified token claims keyed by a digest of the token.
+
+    An entry is only served until the token's ``exp``, after which the token
+    goes through full verification again and is rejected as expired.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: collections.OrderedDict[bytes, tuple[float, dict]] = (
+            collections.OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() >= entry[0]:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: bytes, payload: dict):
+        expire = payload.get("exp")
+        if not isinstance(expire, (int, float)) or self.max_entries <= 0:
+            return
+        self._entries[key] = (expire, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(settings.VERIFIED_TOKEN_CACHE_MAX_ENTRIES)
+
+
+def decode_token(token: str) -> dict:
+    """Verify ``token`` and return its claims, raising ``InvalidTokenError``."""
+    key = hashlib.sha256(token.encode()).digest()
+    payload = verified_tokens.get(key)
+    if payload is None:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+        verified_tokens.put(key, payload)
+    # callers get their own copy, the cached claims stay as verified
+    return dict(payload)
@@ -0,0 +1,184 @@
+"""Per-statement SQL statistics, a slow-query log and captured query plans.
+
+Statements are grouped by their normalized SQL, with literals and the
+expanded parameters of ``IN`` lists and multi-row ``VALUES`` folded away.
+Every group keeps call counts and timings; the first time a group is seen
+on SQLite its ``EXPLAIN QUERY PLAN`` is captured, and any single execution
+slower than ``SLOW_QUERY_THRESHOLD_MS`` is logged.
+"""
+
+import dataclasses
+import json
+import logging
+import random
+import re
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from . import config
+from . import request_timing
+
+logger = logging.getLogger(__name__)
+
+settings = config.get_settings()
+
+_STARTED_KEY = "slow_query_started"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\bIN \((?:\?, )*\?\)", re.IGNORECASE)
+_ROWS = re.compile(r"(\((?:\?, )*\?\))(?:, \1)+")
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def normalize(statement: str) -> str:
+    statement = _SPACE.sub(" ", statement).strip()
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _IN_LIST.sub("IN (...)", statement)
+    return _ROWS.sub(r"\1, ...", statement)
+
+
+def _shape(parameters) -> str:
+    if isinstance(parameters, dict):
+        return (
+            "{"
+            + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items())
+            + "}"
+        )
+    return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+
+
+def parameter_shape(parameters, executemany: bool) -> str:
+    """Types of the bound parameters, never their values."""
+    if executemany:
+        first = parameters[0] if parameters else ()
+        return f"{len(parameters)} x {_shape(first)}"
+    return _shape(parameters or ())
+
+
+@dataclasses.dataclass
+class QueryStats:
+    """Totals of one normalized statement.
+
+    ``calls``, ``total_seconds`` and ``slow_calls`` estimate the real load:
+    each of the ``sampled_calls`` counts as 1 / sample rate calls.
+    """
+
+    statement: str
+    calls: float = 0.0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    slow_calls: float = 0.0
+    sampled_calls: int = 0
+    parameter_shape: str = ""
+    last_route: str | None = None
+    plan: list[str] | None = None
+
+
+class SlowQueryRecorder:
+    def __init__(
+        self,
+        threshold: float,
+        sample_rate: float,
+        max_statements: int,
+        explain: bool,
+    ):
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.max_statements = max_statements
+        self.explain = explain
+        self.statements: dict[str, QueryStats] = {}
+
+    def top(self, limit: int, key: str = "total_seconds") -> list[QueryStats]:
+        return sorted(
+            self.statements.values(), key=lambda s: getattr(s, key), reverse=True
+        )[:limit]
+
+    def clear(self):
+        self.statements.clear()
+
+    def record(self, conn, statement, parameters, executemany, seconds: float):
+        normalized = normalize(statement)
+        stats = self.statements.get(normalized)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                return
+            stats = self.statements[normalized] = QueryStats(normalized)
+            if self.explain:
+                stats.plan = explain_query_plan(
+                    conn, statement, parameters, executemany
+                )
+
+        route = request_timing.current_route()
+        shape = parameter_shape(parameters, executemany)
+        weight = 1 / self.sample_rate
+        stats.sampled_calls += 1
+        stats.calls += weight
+        stats.total_seconds += seconds * weight
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        stats.parameter_shape = shape
+        stats.last_route = route
+
+        if seconds >= self.threshold:
+            stats.slow_calls += weight
+            logger.warning(
+                json.dumps(
+                    {
+                        "slow_query": normalized,
+                        "parameters": shape,
+                        "duration_ms": round(seconds * 1000, 2),
+                        "route": route,
+                    }
+                )
+            )
+
+
+def explain_query_plan(conn, statement, parameters, executemany) -> list[str] | None:
+    """SQLite's plan for ``statement``, run on the same DB-API connection."""
+    if conn.dialect.name != "sqlite":
+        return None
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+
+    # a raw DB-API cursor, so the EXPLAIN itself does not come back through here
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+        return [row[-1] for row in cursor.fetchall()]
+    except Exception as error:
+        return [f"unavailable: {error}"]
+    finally:
+        cursor.close()
+
+
+recorder = SlowQueryRecorder(
+    threshold=settings.SLOW_QUERY_THRESHOLD_MS / 1000,
+    sample_rate=settings.SLOW_QUERY_SAMPLE_RATE,
+    max_statements=settings.SLOW_QUERY_MAX_STATEMENTS,
+    explain=settings.SLOW_QUERY_EXPLAIN,
+)
+
+
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if recorder.sample_rate >= 1 or random.random() < recorder.sample_rate:
+        conn.info[_STARTED_KEY] = time.perf_counter()
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop(_STARTED_KEY, None)
+    if started is not None:
+        recorder.record(
+            conn, statement, parameters, executemany, time.perf_counter() - started
+        )
+
+
+if settings.SLOW_QUERY_ENABLED:
+    event.listen(Engine, "before_cursor_execute", _start_statement)
+    event.listen(Engine, "after_cursor_execute", _record_statement)
@@ -0,0 +1,118 @@
+"""Work done once at startup so the first requests do not pay for it.
+
+SQLAlchemy compiles a statement the first time its shape is executed on an
+engine, pools open connections on first checkout and pydantic serializers,
+bcrypt's worker threads and PyJWT all have a first-call cost. ``warm_up``
+pays all of that before the readiness probe turns green.
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import select
+
+from thaitravel import models, schemas
+from . import config
+from . import password_hashing
+from . import security
+
+logger = logging.getLogger(__name__)
+
+settings = config.get_settings()
+
+
+async def preopen_connections(engine: AsyncEngine, count: int):
+    """Check out ``count`` connections at once so the pool keeps them open."""
+    connections = [await engine.connect() for _ in range(count)]
+    for connection in connections:
+        await connection.close()
+
+
+async def warm_statements():
+    """Execute the hot read statements once so their compiled form is cached."""
+    async with models.read_session_factory() as session:
+        for statement in models.migrations.HOT_QUERIES.values():
+            await session.exec(statement)
+        await session.get(models.DBUser, 0)
+        await session.exec(
+            select(models.DBBaseProvinceTax).where(models.DBBaseProvinceTax.id == 0)
+        )
+
+
+def warm_validators():
+    """Run the request and response models of the hot routes once."""
+    now = datetime.datetime.now()
+    province = next(iter(models.ProvinceEnum))
+    user = models.CurrentUser(
+        id=0,
+        email="warmup@email.local",
+        username="warmup",
+        first_name="Warm",
+        last_name="Up",
+        province=province,
+        register_date=now,
+    )
+    models.User.model_validate(user).model_dump_json()
+    models.Token(
+        access_token="",
+        refresh_token="",
+        token_type="Bearer",
+        expires_in=0,
+        expires_at=now,
+        scope="",
+        issued_at=now,
+        user_id=0,
+    ).model_dump_json()
+    schemas.QuoteRequest.model_validate(
+        {"itineraries": [{"main_province": province, "travellers": 1, "nights": 1}]}
+    )
+
+    # PyJWT picks and prepares its HMAC backend on first use
+    token = security.create_access_token({"sub": 0})
+    security.jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+
+
+async def start_password_hasher():
+    hasher = password_hashing.hasher
+    if hasher.workers > 0:
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(hasher.executor, int) for _ in range(hasher.workers))
+        )
+
+
+async def warm_up() -> dict[str, float]:
+    """Run every warmup step, returning the seconds each one took."""
+    steps = {}
+
+    started = time.perf_counter()
+    engines = {models.engine, models.read_engine}
+    await asyncio.gather(
+        *(
+            preopen_connections(engine, settings.STARTUP_PREOPEN_CONNECTIONS)
+            for engine in engines
+        )
+    )
+    steps["connections"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await warm_statements()
+    steps["statements"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    warm_validators()
+    steps["validators"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await start_password_hasher()
+    steps["password_hasher"] = time.perf_counter() - started
+
+    logger.info(
+        "Warmed up in %.1fms: %s",
+        sum(steps.values()) * 1000,
+        ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in steps.items()),
+    )
+    return steps
@@ -1,8 +1,35 @@
+import asyncio
+import contextlib
+import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from . import models
 from . import routers
+from .core import config
+from .core import metrics
+from .core.login_tracker import last_login_buffer
+from .core import password_hashing
+from .core import profiling
+from .core import warmup
+from .core.request_timing import RequestTimingMiddleware
+from .core.province_tax_cache import province_tax_table
+
+logger = logging.getLogger(__name__)
+
+settings = config.get_settings()
+
+
+async def warm_up_and_get_ready(app: FastAPI):
+    """Warm up while the server already accepts connections, then turn ready."""
+    if settings.STARTUP_WARMUP:
+        try:
+            await warmup.warm_up()
+        except Exception:
+            # warming up only saves the first requests some time
+            logger.exception("Warm-up failed, serving cold")
+    app.state.ready = True
 
 
 @asynccontextmanager
@@ -10,15 +37,79 @@ async def lifespan(app: FastAPI):
     """Application lifespan manager."""
     # Startup
     await models.init_db()
+    async with models.read_session_factory() as session:
+        await province_tax_table.load(session)
+    last_login_buffer.start(models.async_session_factory)
+    metrics_writer = None
+    if metrics.registry.multiproc_dir is not None:
+        metrics_writer = asyncio.create_task(
+            metrics.registry.run_writer(settings.METRICS_FLUSH_INTERVAL)
+        )
+    # the server only accepts connections once startup returns, so the
+    # warm-up runs behind /health/ready instead of before it
+    app.state.ready = False
+    app.state.warmup = asyncio.create_task(warm_up_and_get_ready(app))
     yield
+    app.state.ready = False
     # Shutdown
+    app.state.warmup.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await app.state.warmup
+    if metrics_writer is not None:
+        metrics_writer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await metrics_writer
+        metrics.registry.write_snapshot()
+    await last_login_buffer.stop(models.async_session_factory)
     await models.close_db()
+    password_hashing.hasher.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
 app.include_router(routers.router)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+if settings.REQUEST_TIMING_ENABLED:
+    app.add_middleware(RequestTimingMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.exception_handler(password_hashing.PasswordHasherBusy)
+async def password_hasher_busy_handler(
+    request: Request, exc: password_hashing.PasswordHasherBusy
+) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many password checks in progress, try again later."},
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)},
+    )
 
 
 @app.get("/")
 def read_root() -> dict:
     return {"Hello": "World"}
+
+
+@app.get("/health/live")
+async def live() -> dict:
+    return {"status": "live"}
+
+
+@app.get("/health/ready")
+async def ready(request: Request) -> JSONResponse:
+    """Ready once startup and the background warm-up have finished."""
+    if not getattr(request.app.state, "ready", False):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "starting"},
+        )
+    return JSONResponse(content={"status": "ready"})
+
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
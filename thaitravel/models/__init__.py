@@ -1,31 +1,59 @@
 import asyncio
+import logging
 from typing import AsyncIterator
 
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from thaitravel.core import config
+from thaitravel.core import metrics
 
 from .user_model import *
 from .province_tax_model import *
+from . import db_engine
+from . import migrations
+from . import province_tax_summary
 
-connect_args = {"check_same_thread": False}
+logger = logging.getLogger(__name__)
 
 engine: AsyncEngine = None
+async_session_factory: async_sessionmaker[AsyncSession] = None
+
+# read-only engine for GET endpoints, same as ``engine`` when no separate pool fits
+read_engine: AsyncEngine = None
+read_session_factory: async_sessionmaker[AsyncSession] = None
 
 
-async def init_db():
+async def init_db(settings: config.Settings | None = None):
     """Initialize the database engine and create tables."""
-    global engine
+    global engine, async_session_factory, read_engine, read_session_factory
 
-    engine = create_async_engine(
-        "sqlite+aiosqlite:///database.db",
-        echo=True,
-        future=True,
-        connect_args=connect_args,
+    settings = settings or config.get_settings()
+
+    engine = db_engine.create_engine(settings)
+    async_session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
     )
 
-    await create_db_and_tables()
+    async with engine.connect() as conn:
+        fingerprint = migrations.schema_fingerprint(SQLModel.metadata, conn.dialect)
+        unchanged = (
+            settings.SQLDB_SKIP_UNCHANGED_SCHEMA
+            and await migrations.get_schema_fingerprint(conn) == fingerprint
+        )
+
+    if unchanged:
+        logger.info("Schema unchanged, skipping create_all and migrations")
+    else:
+        await create_db_and_tables()
+        await migrate_db(settings, fingerprint)
+
+    # opened after the tables exist, a read-only connection cannot create the file
+    read_engine = db_engine.create_read_engine(settings) or engine
+    read_session_factory = async_sessionmaker(
+        read_engine, class_=AsyncSession, expire_on_commit=False
+    )
 
 
 async def create_db_and_tables():
@@ -35,19 +63,100 @@ async def create_db_and_tables():
         await conn.run_sync(SQLModel.metadata.create_all)
 
 
+async def migrate_db(settings: config.Settings, fingerprint: str | None = None):
+    """Bring an existing database up to date and verify the hot query plans.
+
+    ``fingerprint`` is stored once the migrations are in and the plans are
+    clean, so the next start with the same models can skip all of this.
+    """
+    async with engine.begin() as conn:
+        await migrations.migrate(conn)
+        table_scans = await migrations.check_query_plans(conn)
+        # a schema with table scans is checked (and warned about) every start
+        if fingerprint is not None and not table_scans:
+            await migrations.set_schema_fingerprint(conn, fingerprint)
+
+    for name, plan in table_scans.items():
+        logger.warning("Hot query %r scans a table: %s", name, "; ".join(plan))
+    if table_scans and settings.SQLDB_STRICT_QUERY_PLANS:
+        raise RuntimeError(f"Hot queries without an index: {', '.join(table_scans)}")
+
+
 async def get_session() -> AsyncIterator[AsyncSession]:
     """Get async database session."""
-    if engine is None:
+    if async_session_factory is None:
+        raise Exception("Database engine is not initialized. Call init_db() first.")
+
+    async with async_session_factory() as session:
+        yield session
+
+
+async def get_read_session() -> AsyncIterator[AsyncSession]:
+    """Get async database session from the read-only pool."""
+    if read_session_factory is None:
         raise Exception("Database engine is not initialized. Call init_db() first.")
 
-    async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-    async with async_session() as session:
+    async with read_session_factory() as session:
         yield session
 
 
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Session factory of the write pool, see ``get_read_session_factory``."""
+    if async_session_factory is None:
+        raise Exception("Database engine is not initialized. Call init_db() first.")
+    return async_session_factory
+
+
+def get_read_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Session factory for work that outlives the request dependencies.
+
+    Sessions from ``get_session``/``get_read_session`` are closed before a
+    ``StreamingResponse`` body runs, so streaming endpoints open their own.
+    """
+    if read_session_factory is None:
+        raise Exception("Database engine is not initialized. Call init_db() first.")
+    return read_session_factory
+
+
+def _pools():
+    engines = {"write": engine, "read": read_engine}
+    if read_engine is engine:
+        del engines["read"]
+    for name, pool_engine in engines.items():
+        pool = pool_engine.pool if pool_engine is not None else None
+        if isinstance(pool, db_engine.InstrumentedQueuePool):
+            yield name, pool
+
+
+metrics.registry.gauge(
+    "db_pool_connections_in_use",
+    "Connections checked out of the pool.",
+    ("pool",),
+    lambda: [((name,), pool.checkedout()) for name, pool in _pools()],
+)
+metrics.registry.gauge(
+    "db_pool_overflow",
+    "Connections open beyond pool_size, negative while the pool is not full.",
+    ("pool",),
+    lambda: [((name,), pool.overflow()) for name, pool in _pools()],
+)
+metrics.registry.gauge(
+    "db_pool_size",
+    "Configured pool_size.",
+    ("pool",),
+    lambda: [((name,), pool.size()) for name, pool in _pools()],
+)
+
+
 async def close_db():
     """Close database connection."""
-    global engine
+    global engine, async_session_factory, read_engine, read_session_factory
+    if read_engine is not None and read_engine is not engine:
+        await read_engine.dispose()
+    read_engine = None
+    read_session_factory = None
+
     if engine is not None:
         await engine.dispose()
         engine = None
+        async_session_factory = None
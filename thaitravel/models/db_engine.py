@@ -0,0 +1,141 @@
+import time
+from urllib.parse import quote
+
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+from thaitravel.core import config
+from thaitravel.core import metrics
+
+
+def is_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+
+def is_sqlite_memory(url: URL) -> bool:
+    """In-memory SQLite databases only exist inside a single connection."""
+    return is_sqlite(url) and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+def is_unique_violation(error: IntegrityError) -> bool:
+    return "UNIQUE constraint failed" in str(error.orig)
+
+
+def sqlite_pragmas(settings: config.Settings, read_only: bool = False) -> list[str]:
+    pragmas = [
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}",
+    ]
+    if read_only:
+        # the journal mode is a property of the file and is set by the writer
+        pragmas.append("PRAGMA query_only=ON")
+    else:
+        pragmas.insert(0, f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    return pragmas
+
+
+def install_sqlite_pragmas(engine: AsyncEngine, pragmas: list[str]):
+    """Run ``pragmas`` on every new DBAPI connection the engine opens."""
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout takes.
+
+    The ``pool`` label is the pool's logging name, which survives
+    ``recreate()`` on dispose.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_checkout.observe(
+                time.perf_counter() - started, self._orig_logging_name or "default"
+            )
+
+
+def _create_engine(
+    url: URL,
+    settings: config.Settings,
+    pool_size: int,
+    max_overflow: int,
+    read_only: bool = False,
+) -> AsyncEngine:
+    kwargs = dict(
+        echo=settings.SQLDB_ECHO,
+        future=True,
+        pool_logging_name="read" if read_only else "write",
+    )
+    if is_sqlite(url):
+        kwargs["connect_args"] = {"check_same_thread": False}
+
+    if is_sqlite_memory(url):
+        # every pooled connection would otherwise see its own empty database
+        kwargs["poolclass"] = StaticPool
+    else:
+        kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=settings.SQLDB_POOL_RECYCLE,
+            pool_timeout=settings.SQLDB_POOL_TIMEOUT,
+        )
+
+    engine = create_async_engine(url, **kwargs)
+
+    if is_sqlite(url):
+        install_sqlite_pragmas(engine, sqlite_pragmas(settings, read_only=read_only))
+
+    return engine
+
+
+def create_engine(settings: config.Settings) -> AsyncEngine:
+    """Create the read-write application engine from ``settings``."""
+    return _create_engine(
+        make_url(settings.SQLDB_URL),
+        settings,
+        pool_size=settings.SQLDB_POOL_SIZE,
+        max_overflow=settings.SQLDB_MAX_OVERFLOW,
+    )
+
+
+def create_read_engine(settings: config.Settings) -> AsyncEngine | None:
+    """Create an engine whose connections open the database read-only.
+
+    Only file based SQLite gets a separate pool: in WAL mode its readers
+    never wait for the writer. For anything else ``None`` is returned and
+    reads share the read-write engine.
+    """
+    url = make_url(settings.SQLDB_URL)
+    if not is_sqlite(url) or is_sqlite_memory(url):
+        return None
+
+    read_url = url.set(
+        # the path is part of a URI, so ?, # and % must be escaped
+        database=f"file:{quote(url.database)}",
+        query={**url.query, "mode": "ro", "uri": "true"},
+    )
+    return _create_engine(
+        read_url,
+        settings,
+        pool_size=settings.SQLDB_READ_POOL_SIZE,
+        max_overflow=settings.SQLDB_READ_MAX_OVERFLOW,
+        read_only=True,
+    )
@@ -0,0 +1,245 @@
+import dataclasses
+import datetime
+import hashlib
+import logging
+from typing import Awaitable, Callable
+
+from sqlalchemy import MetaData, or_, select
+from sqlalchemy.engine import Dialect
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from .user_model import DBUsedRefreshToken, DBUser
+from .province_tax_model import DBRegisteredProvinceTax
+from . import province_tax_summary
+
+logger = logging.getLogger(__name__)
+
+
+Step = str | Callable[[AsyncConnection], Awaitable[None]]
+
+
+@dataclasses.dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    statements: tuple[Step, ...]
+
+
+def add_column(table: str, column: str, definition: str) -> Step:
+    """ALTER TABLE ADD COLUMN, skipped when create_all() already added it."""
+
+    async def step(conn: AsyncConnection):
+        result = await conn.exec_driver_sql(f"PRAGMA table_info({table})")
+        if column not in {row[1] for row in result}:
+            await conn.exec_driver_sql(
+                f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+            )
+
+    return step
+
+
+def unique_index(name: str, table: str, *columns: str) -> Step:
+    """CREATE UNIQUE INDEX, refusing with the duplicate keys if the data has any."""
+    column_list = ", ".join(columns)
+
+    async def step(conn: AsyncConnection):
+        result = await conn.exec_driver_sql(
+            f"SELECT {column_list}, COUNT(*) FROM {table} "
+            f"GROUP BY {column_list} HAVING COUNT(*) > 1 "
+            f"ORDER BY {column_list} LIMIT 20"
+        )
+        duplicates = result.all()
+        if duplicates:
+            keys = "; ".join(
+                f"({', '.join(map(repr, row[:-1]))}) x{row[-1]}" for row in duplicates
+            )
+            raise RuntimeError(
+                f"Cannot create unique index {name}: {table} has duplicate "
+                f"({column_list}) values, remove them first: {keys}"
+            )
+        await conn.exec_driver_sql(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({column_list})"
+        )
+
+    return step
+
+
+# Append only. Steps must also succeed on a database that create_all() just
+# built from the current models, so prefer IF NOT EXISTS forms, add_column()
+# or unique_index().
+MIGRATIONS: list[Migration] = [
+    Migration(
+        version=1,
+        description="index user logins and registration duplicates",
+        statements=(
+            unique_index("ix_users_username", "users", "username"),
+            unique_index("ix_users_email", "users", "email"),
+            unique_index(
+                "ux_registered_province_tax_user_main",
+                "registered_province_tax",
+                "user_id",
+                "main_province_id",
+            ),
+        ),
+    ),
+    Migration(
+        version=2,
+        description="add roles and status to users",
+        statements=(
+            add_column("users", "roles", """JSON NOT NULL DEFAULT '["user"]'"""),
+            add_column("users", "status", "VARCHAR NOT NULL DEFAULT 'active'"),
+        ),
+    ),
+    Migration(
+        version=3,
+        description="index registrations by user in id order for keyset pages",
+        statements=(
+            "CREATE INDEX IF NOT EXISTS ix_registered_province_tax_user_id "
+            "ON registered_province_tax (user_id)",
+        ),
+    ),
+    Migration(
+        version=4,
+        description="add register_date to registrations for date range exports",
+        statements=(
+            add_column("registered_province_tax", "register_date", "DATETIME"),
+            "CREATE INDEX IF NOT EXISTS ix_registered_province_tax_register_date "
+            "ON registered_province_tax (register_date)",
+        ),
+    ),
+    Migration(
+        version=5,
+        description="backfill the per-province registration summary",
+        statements=(province_tax_summary.rebuild,),
+    ),
+]
+
+
+# Queries on the request path that must be answered from an index.
+HOT_QUERIES = {
+    "login by username or email": select(DBUser.id).where(
+        or_(DBUser.username == "", DBUser.email == "")
+    ),
+    "registration duplicate check": select(DBRegisteredProvinceTax.id).where(
+        DBRegisteredProvinceTax.user_id == 0,
+        DBRegisteredProvinceTax.main_province_id == 0,
+    ),
+    "registrations of user": select(DBRegisteredProvinceTax.id)
+    .where(DBRegisteredProvinceTax.user_id == 0)
+    .order_by(DBRegisteredProvinceTax.id)
+    .limit(1),
+    "refresh token family": select(DBUsedRefreshToken.jti).where(
+        DBUsedRefreshToken.family == ""
+    ),
+}
+
+
+async def get_schema_version(conn: AsyncConnection) -> int:
+    await conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR NOT NULL, "
+        "applied_date DATETIME NOT NULL)"
+    )
+    result = await conn.exec_driver_sql("SELECT MAX(version) FROM schema_migrations")
+    return result.scalar() or 0
+
+
+def schema_fingerprint(metadata: MetaData, dialect: Dialect) -> str:
+    """Digest of the DDL of ``metadata`` and of the known migrations."""
+    ddl = []
+    for table in metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)))
+        ddl.extend(
+            str(CreateIndex(index).compile(dialect=dialect))
+            for index in sorted(table.indexes, key=lambda index: index.name)
+        )
+    ddl.extend(f"{m.version}:{m.description}" for m in MIGRATIONS)
+    return hashlib.sha256("\n".join(ddl).encode()).hexdigest()
+
+
+async def get_schema_fingerprint(conn: AsyncConnection) -> str | None:
+    try:
+        result = await conn.exec_driver_sql(
+            "SELECT fingerprint FROM schema_fingerprint WHERE id = 1"
+        )
+    except OperationalError:
+        # no such table yet, a read must not create it
+        return None
+    return result.scalar()
+
+
+async def set_schema_fingerprint(conn: AsyncConnection, fingerprint: str):
+    await conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_fingerprint ("
+        "id INTEGER PRIMARY KEY CHECK (id = 1), "
+        "fingerprint VARCHAR NOT NULL, "
+        "updated_date DATETIME NOT NULL)"
+    )
+    await conn.exec_driver_sql(
+        "INSERT OR REPLACE INTO schema_fingerprint (id, fingerprint, updated_date) "
+        "VALUES (1, ?, ?)",
+        (fingerprint, datetime.datetime.now().isoformat(sep=" ")),
+    )
+
+
+async def migrate(conn: AsyncConnection) -> list[Migration]:
+    """Apply every migration newer than the stored schema version."""
+    current = await get_schema_version(conn)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+
+        logger.info(
+            "Applying migration %s: %s", migration.version, migration.description
+        )
+        for statement in migration.statements:
+            if isinstance(statement, str):
+                await conn.exec_driver_sql(statement)
+            else:
+                await statement(conn)
+        await conn.exec_driver_sql(
+            "INSERT INTO schema_migrations (version, description, applied_date) "
+            "VALUES (?, ?, ?)",
+            (
+                migration.version,
+                migration.description,
+                datetime.datetime.now().isoformat(sep=" "),
+            ),
+        )
+        applied.append(migration)
+    return applied
+
+
+async def explain_query_plan(conn: AsyncConnection, statement) -> list[str]:
+    compiled = statement.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled.string}", params)
+    return [row[-1] for row in result]
+
+
+def is_searched(plan: list[str], table: str) -> bool:
+    """Whether ``plan`` reaches ``table`` only through index searches.
+
+    ``SCAN t USING [COVERING] INDEX i`` walks the whole index, so it fails too.
+    """
+    searched = any(detail.startswith(f"SEARCH {table} ") for detail in plan)
+    scanned = any(
+        detail == f"SCAN {table}" or detail.startswith(f"SCAN {table} ")
+        for detail in plan
+    )
+    return searched and not scanned
+
+
+async def check_query_plans(conn: AsyncConnection) -> dict[str, list[str]]:
+    """Return the plan of every hot query that does not search all its tables."""
+    table_scans = {}
+    for name, statement in HOT_QUERIES.items():
+        plan = await explain_query_plan(conn, statement)
+        tables = {table.name for table in statement.get_final_froms()}
+        if not all(is_searched(plan, table) for table in tables):
+            table_scans[name] = plan
+    return table_scans
@@ -1,5 +1,7 @@
+import datetime
 from typing import Optional
 from pydantic import BaseModel, EmailStr, ConfigDict
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 from .default_setting_model import ProvinceEnum
 from .user_model import DBUser
@@ -28,6 +30,16 @@ class DBBaseProvinceTax(SQLModel, table=True):
 
 class DBRegisteredProvinceTax(SQLModel, table=True):
     __tablename__ = "registered_province_tax"
+    __table_args__ = (
+        Index(
+            "ux_registered_province_tax_user_main",
+            "user_id",
+            "main_province_id",
+            unique=True,
+        ),
+        # (user_id, rowid) order serves keyset pages without a sort
+        Index("ix_registered_province_tax_user_id", "user_id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id")
     name: str
@@ -39,6 +51,12 @@ class DBRegisteredProvinceTax(SQLModel, table=True):
     )
     main_province_tax: float
     secondary_province_tax: Optional[float] = Field(default=None)
+    # the column default also covers core INSERT statements
+    register_date: Optional[datetime.datetime] = Field(
+        default_factory=datetime.datetime.now,
+        sa_column_kwargs={"default": datetime.datetime.now},
+        index=True,
+    )
 
     # Relationship
     main_province_ref: Optional["DBBaseProvinceTax"] = Relationship(
@@ -53,3 +71,18 @@ class DBRegisteredProvinceTax(SQLModel, table=True):
             "foreign_keys": "[DBRegisteredProvinceTax.secondary_province_id]"
         },
     )
+
+
+class DBProvinceTaxSummary(SQLModel, table=True):
+    """Running totals of registrations per province.
+
+    Maintained by every write path that creates registrations, see
+    ``province_tax_summary``.
+    """
+
+    __tablename__ = "province_tax_summary"
+    province_id: int = Field(primary_key=True, foreign_key="provice_tax.id")
+    main_registration_count: int = 0
+    main_tax_total: float = 0
+    secondary_registration_count: int = 0
+    secondary_tax_total: float = 0
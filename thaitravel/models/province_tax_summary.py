@@ -0,0 +1,88 @@
+from collections import defaultdict
+from typing import Iterable, Mapping
+
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .province_tax_model import DBProvinceTaxSummary
+
+table = DBProvinceTaxSummary.__table__
+
+COUNTERS = (
+    "main_registration_count",
+    "main_tax_total",
+    "secondary_registration_count",
+    "secondary_tax_total",
+)
+
+_REBUILD = text("""
+    INSERT INTO province_tax_summary (
+        province_id,
+        main_registration_count,
+        main_tax_total,
+        secondary_registration_count,
+        secondary_tax_total
+    )
+    SELECT province_id, SUM(main_count), SUM(main_total), SUM(sec_count), SUM(sec_total)
+    FROM (
+        SELECT main_province_id AS province_id,
+               COUNT(*) AS main_count,
+               SUM(main_province_tax) AS main_total,
+               0 AS sec_count,
+               0 AS sec_total
+        FROM registered_province_tax
+        GROUP BY main_province_id
+        UNION ALL
+        SELECT secondary_province_id, 0, 0, COUNT(*),
+               COALESCE(SUM(secondary_province_tax), 0)
+        FROM registered_province_tax
+        WHERE secondary_province_id IS NOT NULL
+        GROUP BY secondary_province_id
+    )
+    GROUP BY province_id
+    """)
+
+
+def deltas(registrations: Iterable[Mapping]) -> list[dict]:
+    """Per-province increments for newly inserted registrations."""
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for registration in registrations:
+        main = totals[registration["main_province_id"]]
+        main["main_registration_count"] += 1
+        main["main_tax_total"] += registration["main_province_tax"]
+
+        if registration.get("secondary_province_id"):
+            secondary = totals[registration["secondary_province_id"]]
+            secondary["secondary_registration_count"] += 1
+            secondary["secondary_tax_total"] += (
+                registration.get("secondary_province_tax") or 0
+            )
+    return [
+        {"province_id": province_id, **counters}
+        for province_id, counters in totals.items()
+    ]
+
+
+async def apply(session: AsyncSession, registrations: Iterable[Mapping]):
+    """Add ``registrations`` to the summary inside the caller's transaction."""
+    rows = deltas(registrations)
+    if not rows:
+        return
+
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.province_id],
+        set_={
+            counter: table.c[counter] + statement.excluded[counter]
+            for counter in COUNTERS
+        },
+    )
+    await session.exec(statement, params=rows)
+
+
+async def rebuild(conn: AsyncConnection):
+    """Recompute the whole summary from ``registered_province_tax``."""
+    await conn.execute(delete(table))
+    await conn.execute(_REBUILD)
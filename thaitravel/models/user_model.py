@@ -2,13 +2,14 @@ import datetime
 
 import pydantic
 from pydantic import BaseModel, EmailStr, ConfigDict
+from sqlalchemy import JSON, Column, Index
 from sqlmodel import SQLModel, Field
 
 # from passlib.context import CryptContext
 
 # pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-import bcrypt
 from enum import Enum
+from thaitravel.core.password_hashing import hasher
 from .default_setting_model import ProvinceEnum
 
 
@@ -31,6 +32,24 @@ class User(BaseUser):
     )
 
 
+class Principal(BaseModel):
+    """Who is calling, as far as authorization is concerned."""
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+    id: int
+    roles: tuple[str, ...] = ("user",)
+    status: str = "active"
+
+
+class CurrentUser(User):
+    """Read-only copy of the authenticated user, safe to share between requests."""
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+    roles: tuple[str, ...] = ("user",)
+    status: str = "active"
+    updated_date: datetime.datetime | None = None
+
+
 class ReferenceUser(BaseModel):
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
     username: str
@@ -41,6 +60,7 @@ class ReferenceUser(BaseModel):
 class UserList(BaseModel):
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
     users: list[User]
+    next_cursor: str | None = None
 
 
 class Login(BaseModel):
@@ -77,6 +97,10 @@ class Token(BaseModel):
     user_id: int
 
 
+class RefreshToken(BaseModel):
+    refresh_token: str
+
+
 class ChangedPasswordUser(BaseModel):
     current_password: str
     new_password: str
@@ -84,12 +108,25 @@ class ChangedPasswordUser(BaseModel):
 
 class DBUser(BaseUser, SQLModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_username", "username", unique=True),
+        Index("ix_users_email", "email", unique=True),
+    )
     id: int | None = Field(default=None, primary_key=True)
 
     password: str
 
+    roles: list[str] = Field(
+        default_factory=lambda: ["user"],
+        sa_column=Column(JSON, nullable=False, server_default='["user"]'),
+    )
+    status: str = Field(default="active", sa_column_kwargs={"server_default": "active"})
+
     register_date: datetime.datetime = Field(default_factory=datetime.datetime.now)
-    updated_date: datetime.datetime = Field(default_factory=datetime.datetime.now)
+    updated_date: datetime.datetime = Field(
+        default_factory=datetime.datetime.now,
+        sa_column_kwargs={"onupdate": datetime.datetime.now},
+    )
     last_login_date: datetime.datetime | None = Field(default=None)
 
     async def has_roles(self, roles):
@@ -99,14 +136,29 @@ class DBUser(BaseUser, SQLModel, table=True):
         return False
 
     async def get_encrypted_password(self, plain_password):
-        return bcrypt.hashpw(
-            plain_password.encode("utf-8"), salt=bcrypt.gensalt()
-        ).decode("utf-8")
+        return await hasher.hash(plain_password)
 
     async def set_password(self, plain_password):
         self.password = await self.get_encrypted_password(plain_password)
 
     async def verify_password(self, plain_password):
-        return bcrypt.checkpw(
-            plain_password.encode("utf-8"), self.password.encode("utf-8")
-        )
+        return await hasher.verify(plain_password, self.password)
+
+
+class DBUsedRefreshToken(SQLModel, table=True):
+    """A refresh token that was traded in, kept until it would have expired.
+
+    Tokens rotated from one login share a ``family``; presenting a used token
+    again revokes the whole family.
+    """
+
+    __tablename__ = "used_refresh_tokens"
+    __table_args__ = (
+        Index("ix_used_refresh_tokens_family", "family"),
+        Index("ix_used_refresh_tokens_expires_at", "expires_at"),
+    )
+    jti: str = Field(primary_key=True)
+    family: str
+    user_id: int
+    revoked: bool = False
+    expires_at: datetime.datetime
@@ -0,0 +1,80 @@
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from thaitravel.core import deps
+from thaitravel.core import profiling
+from thaitravel.core import slow_queries
+from thaitravel import schemas
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(deps.RoleChecker("admin"))],
+)
+
+SORT_KEYS = {
+    "total": "total_seconds",
+    "max": "max_seconds",
+    "calls": "calls",
+    "slow": "slow_calls",
+}
+
+
+@router.get("/queries")
+async def get_queries(
+    limit: Annotated[int, Query(ge=1, le=500)] = 20,
+    sort: Literal["total", "max", "calls", "slow"] = "total",
+) -> schemas.QueryStatsList:
+    queries = []
+    for stats in slow_queries.recorder.top(limit, SORT_KEYS[sort]):
+        queries.append(
+            schemas.QueryStats(
+                statement=stats.statement,
+                calls=stats.calls,
+                total_ms=stats.total_seconds * 1000,
+                mean_ms=stats.total_seconds * 1000 / stats.calls if stats.calls else 0,
+                max_ms=stats.max_seconds * 1000,
+                slow_calls=stats.slow_calls,
+                sampled_calls=stats.sampled_calls,
+                parameter_shape=stats.parameter_shape,
+                last_route=stats.last_route,
+                plan=stats.plan,
+            )
+        )
+    return schemas.QueryStatsList(queries=queries)
+
+
+@router.delete("/queries", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_queries():
+    slow_queries.recorder.clear()
+
+
+@router.get("/profiles")
+async def get_profiles() -> schemas.ProfileList:
+    return schemas.ProfileList(
+        profiles=[
+            schemas.ProfileSummary(
+                id=profile.id,
+                method=profile.method,
+                path=profile.path,
+                route=profile.route,
+                status_code=profile.status_code,
+                started_at=profile.started_at,
+                duration_ms=profile.duration_seconds * 1000,
+                samples=profile.samples,
+                interval_ms=profile.interval * 1000,
+            )
+            for profile in reversed(profiling.store.profiles)
+        ]
+    )
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: int) -> str:
+    """Collapsed stacks, one ``frame;frame;frame count`` line per stack."""
+    profile = profiling.store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.collapsed()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Security, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Security, status
 from fastapi.security import (
     HTTPAuthorizationCredentials,
     HTTPBasicCredentials,
@@ -7,12 +7,17 @@ from fastapi.security import (
 )
 
 
-from sqlmodel import select
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import or_, select
 from typing import Annotated
 import datetime
 
 from thaitravel.core import config
+from thaitravel.core import deps
+from thaitravel.core import rate_limit
 from thaitravel.core import security
+from thaitravel.core.login_tracker import last_login_buffer
 from ... import models
 
 router = APIRouter(tags=["authentication"])
@@ -20,25 +25,52 @@ router = APIRouter(tags=["authentication"])
 settings = config.get_settings()
 
 
+def client_address(request: Request) -> str:
+    return request.client.host if request.client else ""
+
+
+async def limit_client(request: Request):
+    retry_after = rate_limit.login_ip_limiter.acquire(client_address(request))
+    if retry_after:
+        raise rate_limit.too_many_requests(retry_after)
+
+
+async def limit_login(
+    request: Request,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+):
+    await limit_client(request)
+    retry_after = rate_limit.login_account_limiter.acquire(
+        form_data.username.strip().lower()
+    )
+    if retry_after:
+        raise rate_limit.too_many_requests(retry_after)
+
+
 @router.post(
     "/token",
+    dependencies=[Depends(limit_login)],
 )
 async def authentication(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Annotated[models.AsyncSession, Depends(models.get_session)],
+    session: Annotated[models.AsyncSession, Depends(models.get_read_session)],
 ) -> models.Token:
 
+    # both columns are uniquely indexed, SQLite answers this with a MULTI-INDEX OR
     result = await session.exec(
-        select(models.DBUser).where(models.DBUser.username == form_data.username)
-    )
-
-    user = result.one_or_none()
-
-    if not user:
-        result = await session.exec(
-            select(models.DBUser).where(models.DBUser.email == form_data.username)
+        select(models.DBUser).where(
+            or_(
+                models.DBUser.username == form_data.username,
+                models.DBUser.email == form_data.username,
+            )
         )
-        user = result.one_or_none()
+    )
+    # a username may equal another user's email, the username wins as before
+    user = min(
+        result.all(),
+        key=lambda user: user.username != form_data.username,
+        default=None,
+    )
 
     if not user:
         raise HTTPException(
@@ -52,28 +84,135 @@ async def authentication(
             detail="Incorrect username or password",
         )
 
-    user.last_login_date = datetime.datetime.now()
+    login_date = datetime.datetime.now()
+    last_login_buffer.record(user.id, login_date)
+
+    return issue_token(user, login_date)
+
+
+@router.post("/token/refresh", dependencies=[Depends(limit_client)])
+async def refresh(
+    refresh_info: models.RefreshToken,
+    session: Annotated[models.AsyncSession, Depends(models.get_session)],
+) -> models.Token:
+    """Trade a refresh token for a new access token, without the password.
+
+    With ``REFRESH_TOKEN_ROTATION`` every refresh token is good for one trade,
+    presenting it a second time revokes every token rotated from the same login.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = security.decode_token(refresh_info.refresh_token)
+        payload["sub"] = int(payload["sub"])
+        jti = payload["jti"]
+    except (security.InvalidTokenError, KeyError, ValueError, TypeError):
+        raise credentials_exception
+    if payload.get("typ") != security.REFRESH_TOKEN_TYPE:
+        raise credentials_exception
+
+    user = await deps.get_current_user(payload, session)
+    if user.status != "active":
+        raise HTTPException(status_code=400, detail="Inactive user")
+
+    if not settings.REFRESH_TOKEN_ROTATION:
+        return issue_token(
+            user, datetime.datetime.now(), refresh_token=refresh_info.refresh_token
+        )
 
-    session.add(user)
+    # the first token of a login starts the family
+    family = payload.get("fam") or jti
+    if not await spend_refresh_token(session, payload, jti, family):
+        raise credentials_exception
+
+    return issue_token(
+        user,
+        datetime.datetime.now(),
+        refresh_token=security.create_refresh_token(
+            data={"sub": user.id, "fam": family}
+        ),
+    )
+
+
+async def spend_refresh_token(
+    session: models.AsyncSession, payload: dict, jti: str, family: str
+) -> bool:
+    """Record ``jti`` as used, False if it was used before or its family is revoked."""
+    now = datetime.datetime.now()
+    result = await session.exec(
+        select(models.DBUsedRefreshToken).where(
+            models.DBUsedRefreshToken.family == family
+        )
+    )
+    used = result.all()
+    if any(token.revoked or token.jti == jti for token in used):
+        await revoke_refresh_family(session, family, now)
+        return False
+
+    session.add(
+        models.DBUsedRefreshToken(
+            jti=jti,
+            family=family,
+            user_id=payload["sub"],
+            expires_at=datetime.datetime.fromtimestamp(payload["exp"]),
+        )
+    )
+    # nothing is denied past its exp, the signature check rejects it anyway
+    await session.exec(
+        delete(models.DBUsedRefreshToken).where(
+            models.DBUsedRefreshToken.expires_at < now
+        )
+    )
+    try:
+        await session.commit()
+    except IntegrityError:
+        # the same token traded in by a concurrent request
+        await session.rollback()
+        await revoke_refresh_family(session, family, now)
+        return False
+    return True
+
+
+async def revoke_refresh_family(
+    session: models.AsyncSession, family: str, now: datetime.datetime
+):
+    # kept as long as the newest token of the family can still be valid
+    await session.exec(
+        update(models.DBUsedRefreshToken)
+        .where(models.DBUsedRefreshToken.family == family)
+        .values(
+            revoked=True,
+            expires_at=now
+            + datetime.timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+        )
+    )
     await session.commit()
-    await session.refresh(user)
+
+
+def issue_token(
+    user: models.User, issued_at: datetime.datetime, refresh_token: str | None = None
+) -> models.Token:
+    access_claims = {"sub": user.id}
+    if settings.AUTH_STATELESS_CLAIMS:
+        access_claims.update(roles=list(user.roles), status=user.status)
 
     access_token_expires = datetime.timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
     return models.Token(
         access_token=security.create_access_token(
-            data={"sub": user.id},
-            expires_delta=access_token_expires,
-        ),
-        refresh_token=security.create_refresh_token(
-            data={"sub": user.id},
+            data=access_claims,
             expires_delta=access_token_expires,
         ),
+        refresh_token=refresh_token
+        or security.create_refresh_token(data={"sub": user.id}),
         token_type="Bearer",
         scope="",
         expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES,
-        expires_at=datetime.datetime.now() + access_token_expires,
-        issued_at=user.last_login_date,
+        expires_at=issued_at + access_token_expires,
+        issued_at=issued_at,
         user_id=user.id,
     )
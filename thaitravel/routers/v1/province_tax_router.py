@@ -1,13 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlmodel import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
 from typing import Annotated, List
+import datetime
 
+import numpy as np
+
+from thaitravel.core import config
 from thaitravel.core import deps
+from thaitravel.core import http_cache
+from thaitravel.core import pagination
+from thaitravel.core import quote_engine
+from thaitravel.core.province_tax_cache import province_tax_table
+from thaitravel.core import registration_export
+from thaitravel.core import registration_import
+from thaitravel.core import request_timing
 from thaitravel import models, schemas
 
 router = APIRouter(prefix="/province_tax", tags=["province_tax"])
 
+settings = config.get_settings()
+
 
 # CREATE BaseProvinceTax
 @router.post(
@@ -32,14 +49,76 @@ async def create_base_province_tax(
     return schemas.BaseProvinceTax.from_orm(db_item)
 
 
+# CREATE or UPDATE many BaseProvinceTax in one transaction
+@router.put(
+    "/base/bulk",
+    response_model=List[schemas.UpsertedProvinceTax],
+    dependencies=[Depends(deps.RoleChecker("admin"))],
+)
+async def upsert_base_province_tax(
+    data: List[schemas.BaseProvinceTax],
+    session: Annotated[AsyncSession, Depends(models.get_session)],
+):
+    # ถ้าจังหวัดซ้ำกันใน request ใช้ค่าสุดท้าย
+    taxes = {item.province: item.tax for item in data}
+    if not taxes:
+        return []
+
+    table = models.DBBaseProvinceTax.__table__
+    returning = (table.c.id, table.c.province, table.c.tax)
+
+    # RETURNING cannot tell an insert from an update, so the status comes from
+    # the statement that wrote the row. The first one takes the write lock,
+    # nothing can add a province before the second one runs.
+    result = await session.exec(
+        insert(table).on_conflict_do_nothing().returning(*returning),
+        params=[{"province": province, "tax": tax} for province, tax in taxes.items()],
+    )
+    upserted = {row.province: (row, schemas.UpsertStatus.CREATED) for row in result}
+
+    existing = {
+        province: tax for province, tax in taxes.items() if province not in upserted
+    }
+    if existing:
+        statement = insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.province], set_={"tax": statement.excluded.tax}
+        ).returning(*returning)
+        result = await session.exec(
+            statement,
+            params=[
+                {"province": province, "tax": tax} for province, tax in existing.items()
+            ],
+        )
+        upserted.update(
+            (row.province, (row, schemas.UpsertStatus.UPDATED)) for row in result
+        )
+    await session.commit()
+    # core statements bypass the ORM flush hooks
+    province_tax_table.invalidate()
+
+    return [
+        schemas.UpsertedProvinceTax(
+            id=row.id, province=row.province, tax=row.tax, status=upserted_status
+        )
+        for row, upserted_status in (upserted[province] for province in taxes)
+    ]
+
+
 # READ BaseProvinceTax
 @router.get("/base", response_model=List[schemas.ProvinceTax])
 async def get_base_province_tax(
-    session: Annotated[AsyncSession, Depends(models.get_session)],
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(models.get_read_session)],
 ):
-    result = await session.exec(select(models.DBBaseProvinceTax))
-    db_items = result.all()
-    return [schemas.ProvinceTax.model_validate(item) for item in db_items]
+    snapshot = await province_tax_table.get(session)
+    not_modified = http_cache.conditional(
+        request, response, "province_tax_base", snapshot.etag
+    )
+    if not_modified:
+        return not_modified
+    return list(snapshot.items)
 
 
 # CREATE RegisteredProvinceTax
@@ -53,42 +132,27 @@ async def register_province_tax(
     session: Annotated[AsyncSession, Depends(models.get_session)],
     current_user: models.User = Depends(deps.get_current_user),
 ):
-    # ตรวจสอบซ้ำ
-    exist = await session.exec(
-        select(models.DBRegisteredProvinceTax).where(
-            models.DBRegisteredProvinceTax.user_id == current_user.id,
-            models.DBRegisteredProvinceTax.main_province_id == data.main_province_id,
-        )
-    )
-    if exist.first():
-        raise HTTPException(
-            status_code=409, detail="Already registered for this province."
-        )
+    # ดึง tax ของ main_province และ secondary_province (ถ้ามี) จาก cache
+    province_ids = [data.main_province_id]
+    if data.secondary_province_id:
+        province_ids.append(data.secondary_province_id)
+    with request_timing.phase("provinces"):
+        province_taxes = await province_tax_table.lookup(session, province_ids)
 
-    # ดึง tax ของ main_province
-    main_tax_result = await session.exec(
-        select(models.DBBaseProvinceTax).where(
-            models.DBBaseProvinceTax.id == data.main_province_id
-        )
-    )
-    main_tax_obj = main_tax_result.first()
+    main_tax_obj = province_taxes.get(data.main_province_id)
     if not main_tax_obj:
         raise HTTPException(status_code=404, detail="Main province not found.")
 
-    # ดึง tax ของ secondary_province (ถ้ามี)
     secondary_tax = None
     if data.secondary_province_id:
-        sec_tax_result = await session.exec(
-            select(models.DBBaseProvinceTax).where(
-                models.DBBaseProvinceTax.id == data.secondary_province_id
-            )
-        )
-        sec_tax_obj = sec_tax_result.first()
+        sec_tax_obj = province_taxes.get(data.secondary_province_id)
         if not sec_tax_obj:
             raise HTTPException(status_code=404, detail="Secondary province not found.")
         secondary_tax = sec_tax_obj.tax
 
-    reg = models.DBRegisteredProvinceTax(
+    # การลงทะเบียนซ้ำถูกกันด้วย unique index (user_id, main_province_id)
+    table = models.DBRegisteredProvinceTax.__table__
+    values = dict(
         user_id=current_user.id,
         name=data.name,
         email=data.email,
@@ -97,25 +161,230 @@ async def register_province_tax(
         secondary_province_id=data.secondary_province_id,
         secondary_province_tax=secondary_tax,
     )
-    session.add(reg)
-    await session.commit()
-    await session.refresh(reg)
+    try:
+        result = await session.exec(insert(table).values(**values).returning(*table.c))
+        reg = result.one()
+        await models.province_tax_summary.apply(session, [values])
+        with request_timing.phase("commit"):
+            await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        if not models.db_engine.is_unique_violation(e):
+            raise
+        raise HTTPException(
+            status_code=409, detail="Already registered for this province."
+        )
+
     return schemas.RegisteredProvinceTax.model_validate(reg, from_attributes=True)
 
 
+# CREATE RegisteredProvinceTax จากไฟล์ NDJSON ทีละหลายแถว
+@router.post(
+    "/register/import",
+    response_class=StreamingResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {"type": "string", "format": "binary"}
+                }
+            },
+        }
+    },
+)
+async def import_registered_province_tax(
+    request: Request,
+    session_factory: Annotated[async_sessionmaker, Depends(models.get_session_factory)],
+    batch_size: Annotated[
+        int, Query(ge=1, le=settings.IMPORT_MAX_BATCH_SIZE)
+    ] = settings.IMPORT_BATCH_SIZE,
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    """Import one ``RegisterProvinceTaxRequest`` per line.
+
+    The response has one ``RegistrationImportResult`` per non-empty line,
+    sent as each batch commits, followed by a ``{"summary": ...}`` line.
+    """
+    lines = registration_import.iter_lines(
+        request.stream(), settings.IMPORT_MAX_LINE_BYTES
+    )
+    return registration_import.UploadStreamingResponse(
+        registration_import.stream_import(
+            session_factory,
+            current_user.id,
+            batch_size,
+            lines,
+            settings.IMPORT_RESULT_SPOOL_BYTES,
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
 # READ RegisteredProvinceTax (เฉพาะของ user)
 @router.get("/registered", response_model=List[schemas.RegisteredProvinceTax])
 async def get_registered_province_tax(
-    session: Annotated[AsyncSession, Depends(models.get_session)],
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(models.get_read_session)],
+    cursor: str | None = None,
+    limit: pagination.Limit = settings.PAGINATION_DEFAULT_LIMIT,
     current_user: models.User = Depends(deps.get_current_user),
 ):
+    """List in ``id`` order, the next page is given by the ``X-Next-Cursor`` header."""
+    statement = select(models.DBRegisteredProvinceTax).where(
+        models.DBRegisteredProvinceTax.user_id == current_user.id
+    )
+    if cursor:
+        (last_id,) = pagination.decode_cursor(cursor, int)
+        statement = statement.where(models.DBRegisteredProvinceTax.id > last_id)
+
     result = await session.exec(
-        select(models.DBRegisteredProvinceTax).where(
-            models.DBRegisteredProvinceTax.user_id == current_user.id
-        )
+        statement.order_by(models.DBRegisteredProvinceTax.id).limit(limit + 1)
     )
     db_items = result.all()
+
+    next_cursor = None
+    if len(db_items) > limit:
+        db_items = db_items[:limit]
+        next_cursor = pagination.encode_cursor(db_items[-1].id)
+    pagination.set_next_cursor(request, response, next_cursor)
+
+    with request_timing.phase("serialize"):
+        return [
+            schemas.RegisteredProvinceTax.model_validate(item, from_attributes=True)
+            for item in db_items
+        ]
+
+
+# EXPORT RegisteredProvinceTax ทั้งหมดสำหรับฝ่ายบัญชี
+@router.get(
+    "/registered/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(deps.RoleChecker("admin"))],
+)
+async def export_registered_province_tax(
+    session: Annotated[AsyncSession, Depends(models.get_read_session)],
+    session_factory: Annotated[
+        async_sessionmaker, Depends(models.get_read_session_factory)
+    ],
+    export_format: Annotated[
+        schemas.ExportFormat, Query(alias="format")
+    ] = schemas.ExportFormat.CSV,
+    province: models.ProvinceEnum | None = None,
+    date_from: datetime.datetime | None = None,
+    date_to: datetime.datetime | None = None,
+):
+    """Stream every registration as CSV or NDJSON.
+
+    ``province`` matches the main or secondary province, ``date_from`` and
+    ``date_to`` bound ``register_date`` (``date_to`` is exclusive).
+    """
+    province_id = None
+    if province:
+        snapshot = await province_tax_table.get(session)
+        if province not in snapshot.by_province:
+            raise HTTPException(status_code=404, detail="Province not found.")
+        province_id = snapshot.by_province[province].id
+
+    statement = registration_export.export_statement(province_id, date_from, date_to)
+    media_type, extension = {
+        schemas.ExportFormat.CSV: ("text/csv", "csv"),
+        schemas.ExportFormat.NDJSON: ("application/x-ndjson", "ndjson"),
+    }[export_format]
+    return StreamingResponse(
+        registration_export.stream_registrations(
+            session_factory, statement, export_format, settings.EXPORT_CHUNK_ROWS
+        ),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="registered_province_tax.{extension}"'
+            )
+        },
+    )
+
+
+# READ ยอดรวมต่อจังหวัดจากตาราง summary
+@router.get(
+    "/summary",
+    response_model=List[schemas.ProvinceTaxSummary],
+    dependencies=[Depends(deps.RoleChecker("admin"))],
+)
+async def get_province_tax_summary(
+    session: Annotated[AsyncSession, Depends(models.get_read_session)],
+):
+    """Registration counts and tax totals per province.
+
+    Reads the incrementally maintained summary table, one row per province,
+    however many registrations exist.
+    """
+    result = await session.exec(
+        select(models.DBProvinceTaxSummary, models.DBBaseProvinceTax.province)
+        .join(
+            models.DBBaseProvinceTax,
+            models.DBBaseProvinceTax.id == models.DBProvinceTaxSummary.province_id,
+        )
+        .order_by(models.DBProvinceTaxSummary.province_id)
+    )
     return [
-        schemas.RegisteredProvinceTax.model_validate(item, from_attributes=True)
-        for item in db_items
+        schemas.ProvinceTaxSummary(
+            province=province,
+            registration_count=(
+                summary.main_registration_count + summary.secondary_registration_count
+            ),
+            tax_total=summary.main_tax_total + summary.secondary_tax_total,
+            **summary.model_dump(),
+        )
+        for summary, province in result.all()
     ]
+
+
+# QUOTE ภาษีของหลาย itinerary พร้อมกัน
+@router.post("/quote", response_model=schemas.QuoteResponse)
+async def quote_province_tax(
+    data: schemas.QuoteRequest,
+    session: Annotated[AsyncSession, Depends(models.get_read_session)],
+):
+    """Quote a batch of itineraries, rates are charged per traveller per night."""
+    snapshot = await province_tax_table.get(session)
+    itineraries = data.itineraries
+    quotes = quote_engine.quote(
+        quote_engine.rates_for_snapshot(snapshot),
+        main=quote_engine.ordinals(i.main_province for i in itineraries),
+        secondary=quote_engine.ordinals(i.secondary_province for i in itineraries),
+        travellers=np.fromiter((i.travellers for i in itineraries), dtype=np.int64),
+        nights=np.fromiter((i.nights for i in itineraries), dtype=np.int64),
+    )
+
+    if quotes.missing.any():
+        missing = {
+            province.value
+            for index in np.flatnonzero(quotes.missing)
+            for province in (
+                itineraries[index].main_province,
+                itineraries[index].secondary_province,
+            )
+            if province and province not in snapshot.by_province
+        }
+        raise HTTPException(
+            status_code=404,
+            detail=f"No tax rate for province: {', '.join(sorted(missing))}.",
+        )
+
+    has_secondary = [i.secondary_province is not None for i in itineraries]
+    return schemas.QuoteResponse(
+        quotes=[
+            schemas.Quote(
+                main_province_tax=main_tax,
+                secondary_province_tax=secondary_tax if secondary else None,
+                total=total,
+            )
+            for main_tax, secondary_tax, total, secondary in zip(
+                quotes.main_tax.tolist(),
+                quotes.secondary_tax.tolist(),
+                quotes.total.tolist(),
+                has_secondary,
+            )
+        ]
+    )
@@ -1,32 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
+from sqlalchemy.exc import IntegrityError
 
 from typing import Annotated
 
 from thaitravel.core import deps
+from thaitravel.core import config
+from thaitravel.core import http_cache
+from thaitravel.core import pagination
+from thaitravel.core import request_timing
 from thaitravel import models
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+settings = config.get_settings()
 
-@router.get("/me")
-def get_me(current_user: models.User = Depends(deps.get_current_user)) -> models.User:
+
+@router.get("", dependencies=[Depends(deps.RoleChecker("admin"))])
+async def get_all(
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(models.get_read_session)],
+    cursor: str | None = None,
+    limit: pagination.Limit = settings.PAGINATION_DEFAULT_LIMIT,
+) -> models.UserList:
+    statement = select(models.DBUser)
+    if cursor:
+        (last_id,) = pagination.decode_cursor(cursor, int)
+        statement = statement.where(models.DBUser.id > last_id)
+
+    result = await session.exec(statement.order_by(models.DBUser.id).limit(limit + 1))
+    users = result.all()
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = pagination.encode_cursor(users[-1].id)
+    pagination.set_next_cursor(request, response, next_cursor)
+
+    with request_timing.phase("serialize"):
+        return models.UserList(users=users, next_cursor=next_cursor)
+
+
+def user_etag(user: models.User) -> str:
+    return http_cache.make_etag(user.id, user.updated_date, user.last_login_date)
+
+
+@router.get("/me", response_model=models.User)
+def get_me(
+    request: Request,
+    response: Response,
+    current_user: models.User = Depends(deps.get_current_user),
+):
+    not_modified = http_cache.conditional(
+        request, response, "users_me", user_etag(current_user)
+    )
+    if not_modified:
+        return not_modified
     return current_user
 
 
-@router.get("/{user_id}")
+@router.get("/{user_id}", response_model=models.User)
 async def get(
     user_id: str,
-    session: Annotated[AsyncSession, Depends(models.get_session)],
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(models.get_read_session)],
     current_user: models.User = Depends(deps.get_current_user),
-) -> models.User:
+):
     user = await session.get(models.DBUser, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Not found this user",
         )
+    not_modified = http_cache.conditional(
+        request, response, "users_get", user_etag(user)
+    )
+    if not_modified:
+        return not_modified
     return user
 
 
@@ -51,6 +104,13 @@ async def create(
     user = models.DBUser.from_orm(user_info)
     await user.set_password(user_info.password)
     session.add(user)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This username or email is exists.",
+        )
 
     return user
@@ -1 +1,2 @@
 from .province_tax_schemas import *
+from .admin_schemas import *
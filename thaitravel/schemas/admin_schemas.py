@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class QueryStats(BaseModel):
+    statement: str
+    calls: float
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    slow_calls: float
+    sampled_calls: int
+    parameter_shape: str
+    last_route: Optional[str] = None
+    plan: Optional[list[str]] = None
+
+
+class QueryStatsList(BaseModel):
+    queries: list[QueryStats]
+
+
+class ProfileSummary(BaseModel):
+    id: int
+    method: str
+    path: str
+    route: Optional[str] = None
+    status_code: Optional[int] = None
+    started_at: datetime
+    duration_ms: float
+    samples: int
+    interval_ms: float
+
+
+class ProfileList(BaseModel):
+    profiles: list[ProfileSummary]
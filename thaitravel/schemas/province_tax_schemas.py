@@ -1,7 +1,7 @@
 from typing import Optional
 from datetime import datetime
 from decimal import Decimal
-from pydantic import BaseModel, EmailStr, ConfigDict
+from pydantic import BaseModel, EmailStr, ConfigDict, Field
 from enum import Enum
 from ..models.default_setting_model import ProvinceEnum
 
@@ -17,6 +17,15 @@ class ProvinceTax(BaseProvinceTax):
     id: int
 
 
+class UpsertStatus(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+
+
+class UpsertedProvinceTax(ProvinceTax):
+    status: UpsertStatus
+
+
 class RegisteredProvinceTax(BaseModel):
     id: int
     user_id: int
@@ -26,6 +35,7 @@ class RegisteredProvinceTax(BaseModel):
     main_province_tax: float
     secondary_province_id: Optional[int] = None
     secondary_province_tax: Optional[float] = None
+    register_date: Optional[datetime] = None
 
 
 class RegisterProvinceTaxRequest(BaseModel):
@@ -33,3 +43,62 @@ class RegisterProvinceTaxRequest(BaseModel):
     email: EmailStr
     main_province_id: int
     secondary_province_id: Optional[int] = None
+
+
+class ImportStatus(str, Enum):
+    CREATED = "created"
+    DUPLICATE = "duplicate"
+    INVALID = "invalid"
+    NOT_FOUND = "not_found"
+
+
+class RegistrationImportResult(BaseModel):
+    line: int
+    status: ImportStatus
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class RegistrationImportSummary(BaseModel):
+    total: int
+    created: int
+    duplicate: int
+    invalid: int
+    not_found: int
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class ProvinceTaxSummary(BaseModel):
+    province_id: int
+    province: ProvinceEnum
+    registration_count: int
+    main_registration_count: int
+    secondary_registration_count: int
+    tax_total: float
+    main_tax_total: float
+    secondary_tax_total: float
+
+
+class QuoteItinerary(BaseModel):
+    main_province: ProvinceEnum
+    secondary_province: Optional[ProvinceEnum] = None
+    travellers: int = Field(ge=1)
+    nights: int = Field(ge=1)
+
+
+class QuoteRequest(BaseModel):
+    itineraries: list[QuoteItinerary] = Field(min_length=1, max_length=10_000)
+
+
+class Quote(BaseModel):
+    main_province_tax: float
+    secondary_province_tax: Optional[float] = None
+    total: float
+
+
+class QuoteResponse(BaseModel):
+    quotes: list[Quote]